@@ -1,48 +1,356 @@
-from statistics import StatisticsError, mode
 import traceback
-from flask import Flask, request, jsonify, send_file
-import matplotlib
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 import pandas as pd
 import numpy as np
-import io
-import seaborn as sns
-import matplotlib.pyplot as plt
-matplotlib.use('Agg')
 from datetime import datetime
-from scipy.stats import zscore
-from sklearn.ensemble import IsolationForest
-from sklearn.neighbors import LocalOutlierFactor
-import statistics
+import os
+import time
+import json
+from dataset_store import DatasetStore, DatasetNotFound, compact_frame, table_to_frame, frame_to_table
+from date_engine import DETECTION_DATE_FORMATS, parse_dates
+from column_stats import column_statistics
+from profiling import iter_completed, iter_profiled_columns, profile_columns, numeric_invalid_mask
+from typed_columns import coerced_numeric_column, numeric_column
+from chart_cache import ChartCache, chart_key
+from render_pool import RenderPool, RenderPoolBusy, RenderTimeout
+from rendering import generate_chart, render_boxen_with_outliers
+from chart_specs import choose_xscale, chart_spec, outliers_spec
+from response_encoding import stream_records_response, table_body_response
+from outliers import (calculate_iqr_thresholds, choose_outlier_detection_method, detect_outliers,
+                      resolve_outliers)
+import operations
+from operations import OperationError, run_pipeline
+from planner import LazyPlan
+from chunked import DEFAULT_CHUNK_SIZE, run_chunked
+from versions import HistoryError, VersionNotFound
+from dedupe import row_index
+from jobs import JobNotFound, JobQueue, JobQueueFull, report_progress
 
 app = Flask(__name__)
 
+dataset_store = DatasetStore(
+    max_datasets=int(os.environ.get('DATASWEEP_MAX_DATASETS', 64)),
+    max_bytes=int(os.environ.get('DATASWEEP_MAX_DATASET_BYTES', 1024 ** 3)),
+    idle_seconds=int(os.environ.get('DATASWEEP_DATASET_IDLE_SECONDS', 30 * 60)),
+    history_bytes=int(os.environ.get('DATASWEEP_HISTORY_BYTES', 256 * 1024 ** 2)),
+    spill_dir=os.environ.get('DATASWEEP_HISTORY_DIR'),
+)
+
+chart_cache = ChartCache(
+    max_bytes=int(os.environ.get('DATASWEEP_CHART_CACHE_BYTES', 64 * 1024 ** 2)),
+    disk_dir=os.environ.get('DATASWEEP_CHART_CACHE_DIR'),
+    max_disk_bytes=int(os.environ.get('DATASWEEP_CHART_CACHE_DISK_BYTES', 512 * 1024 ** 2)),
+)
+
+render_pool = RenderPool(
+    workers=int(os.environ.get('DATASWEEP_RENDER_WORKERS', 2)),
+    max_pending=int(os.environ.get('DATASWEEP_RENDER_QUEUE', 16)),
+    timeout=float(os.environ.get('DATASWEEP_RENDER_TIMEOUT', 60)),
+    queue_wait=float(os.environ.get('DATASWEEP_RENDER_QUEUE_WAIT', 1)),
+)
+
+job_queue = JobQueue(
+    workers=int(os.environ.get('DATASWEEP_JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('DATASWEEP_JOB_QUEUE', 32)),
+    max_finished=int(os.environ.get('DATASWEEP_JOB_HISTORY', 100)),
+)
+
+# Chunked (out-of-core) runs read and write files only inside this directory; unset disables them
+data_dir = os.environ.get('DATASWEEP_DATA_DIR')
+
+
+def request_table():
+    # Routes accept either the full table in 'data' or a 'dataset_id' from /upload_dataset
+    return request_table_and_caches()[0]
+
+def request_table_and_caches():
+    # request_table() plus, for a stored dataset, the typed-column caches (typed_columns.py)
+    # of that same version, read together; the caches are None for inline data
+    dataset_id = request.json.get('dataset_id')
+    if dataset_id:
+        frame, caches, g.dataset_version = dataset_store.snapshot(dataset_id)
+        return frame_to_table(frame), caches
+    return request.json.get('data'), None
+
+def commit_stored_dataset(dataset_id, frame, operation):
+    # Commits on top of the version this request read (g.dataset_version, set wherever a
+    # stored dataset is read), so a request that overlapped another one on the same
+    # dataset gets a 409 instead of silently overwriting it
+    return stored_dataset_payload(dataset_store.replace(
+        dataset_id, frame, operation=operation, base_version=g.get('dataset_version'),
+        delta_from=request.json.get('delta_from'),
+    ))
+
+def column_cache_of(table, caches, column_name):
+    # Cache of a uniquely named column; None for inline data or a missing/repeated name
+    if caches is None or table[0].count(column_name) != 1:
+        return None
+    return caches[table[0].index(column_name)]
+
+def stored_dataset_payload(state):
+    # Opt-in patch responses: with "delta_from": <version id the client holds>, send only
+    # the removed rows and changed columns; fall back to the full table when rows were reordered.
+    # `state` is DatasetStore.state(), so info, delta and table all describe one version
+    info, delta, frame = state
+    if delta is not None:
+        return {"dataset": info, "delta": delta}
+    if frame is not None:
+        return {"dataset": info, "data": frame_to_table(frame)}
+    return info
+
+def request_lod_threshold():
+    # Optional row count above which charts aggregate points; None uses the default
+    value = request.json.get('lod_threshold')
+    if value is None:
+        return None
+    try:
+        threshold = int(value)
+    except (TypeError, ValueError):
+        raise OperationError("lod_threshold must be an integer")
+    if threshold < 0 or threshold != float(value):
+        raise OperationError("lod_threshold must be a non-negative integer")
+    return threshold
+
+def request_max_iterations():
+    # Rounds of Resolve Outliers before it stops even if outliers remain
+    value = request.json.get('max_iterations', 100)
+    try:
+        max_iterations = int(value)
+    except (TypeError, ValueError):
+        raise OperationError("max_iterations must be an integer")
+    if max_iterations != float(value) or max_iterations < 1:
+        raise OperationError("max_iterations must be a positive integer")
+    return max_iterations
+
+def request_tolerance():
+    # Share of outliers left at which Resolve Outliers stops early
+    value = request.json.get('tolerance', 0.0)
+    try:
+        tolerance = float(value)
+    except (TypeError, ValueError):
+        raise OperationError("tolerance must be a number")
+    if not tolerance >= 0:  # NaN included
+        raise OperationError("tolerance must not be negative")
+    return tolerance
+
+def table_response(table):
+    # `table` is a list of lists (header first) or a DataFrame.
+    # With a dataset_id the result replaces the stored dataset and only a summary is sent back
+    dataset_id = request.json.get('dataset_id')
+    if dataset_id:
+        frame = table if isinstance(table, pd.DataFrame) else table_to_frame(table)
+        return jsonify(commit_stored_dataset(dataset_id, frame, request.path.lstrip('/')))
+    return table_body_response(table)
+
+def png_response(cache_key, png, headers=None, download_name=None):
+    # Charts are content-addressed, so the cache key doubles as the ETag
+    response = Response(png, mimetype='image/png')
+    if download_name:
+        response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    response.headers.update(headers or {})
+    response.set_etag(cache_key)
+    return response.make_conditional(request)
+
+def cached_png_response(cache_key, download_name=None):
+    # Returns a response when the client or the chart cache already has this chart, else None
+    if request.if_none_match.contains(cache_key):
+        response = Response(status=304)
+        response.set_etag(cache_key)
+        return response
+    cached = chart_cache.get(cache_key)
+    if cached is not None:
+        png, headers = cached
+        return png_response(cache_key, png, headers, download_name)
+    return None
+
+def spec_response(cache_key, spec):
+    # JSON chart specs are content-addressed like the PNGs
+    response = jsonify(spec)
+    response.set_etag(cache_key)
+    return response.make_conditional(request)
+
+@app.errorhandler(DatasetNotFound)
+def dataset_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+@app.errorhandler(VersionNotFound)
+def version_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+@app.errorhandler(HistoryError)
+def history_error(e):
+    return jsonify({"error": str(e)}), 409
+
+@app.errorhandler(OperationError)
+def operation_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.errorhandler(RenderPoolBusy)
+def render_pool_busy(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.errorhandler(RenderTimeout)
+def render_timeout(e):
+    return jsonify({"error": str(e)}), 504
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    # MAX_CONTENT_LENGTH is set by serve.py (DATASWEEP_MAX_REQUEST_BYTES)
+    return jsonify({"error": "Request body is too large; upload the dataset once and send its dataset_id"}), 413
+
+@app.errorhandler(JobNotFound)
+def job_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+@app.errorhandler(JobQueueFull)
+def job_queue_full(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.route('/upload_dataset', methods=['POST'])
+def upload_dataset():
+    if 'file' in request.files:
+        df = pd.read_csv(request.files['file'], keep_default_na=False)
+        table = frame_to_table(df)
+        classifications = request.form.get('classifications')
+        classifications = json.loads(classifications) if classifications else None
+    else:
+        table = request.json.get('data') if request.is_json else None
+        classifications = request.json.get('classifications') if request.is_json else None
 
+    if not table:
+        return jsonify({"error": "No data provided"}), 400
 
-def to_title_case(string):
-    return ' '.join([word.capitalize() if len(word) > 1 else word.upper() for word in string.split(' ')])
-
-def to_sentence_case(string):
-    if not string:
-        return string
-    return string[0].upper() + string[1:].lower()
+    frame = table_to_frame(table)
+    memory = None
+    if classifications:
+        # Compact dtypes picked from the classifications; tables read back unchanged
+        frame, memory = compact_frame(frame, classifications)
+    dataset_id = dataset_store.put(frame)
+    info = dataset_store.info(dataset_id)
+    if memory is not None:
+        info["memory"] = memory
+    return jsonify(info)
+
+@app.route('/datasets/<dataset_id>', methods=['GET'])
+def get_dataset(dataset_id):
+    return table_body_response(dataset_store.get(dataset_id))
+
+@app.route('/datasets/<dataset_id>', methods=['DELETE'])
+def delete_dataset(dataset_id):
+    dataset_store.delete(dataset_id)
+    return jsonify({"deleted": dataset_id})
+
+@app.route('/datasets/<dataset_id>/versions', methods=['GET'])
+def dataset_versions(dataset_id):
+    return jsonify(dataset_store.versions(dataset_id))
+
+@app.route('/datasets/<dataset_id>/delta', methods=['GET'])
+def dataset_delta(dataset_id):
+    # Patch from ?from=<version_id> to the current version, e.g. after undo/redo
+    base_version = request.args.get('from')
+    if not base_version:
+        return jsonify({"error": "No base version provided"}), 400
+    return jsonify(stored_dataset_payload(dataset_store.state(dataset_id, base_version)))
+
+@app.route('/datasets/<dataset_id>/undo', methods=['POST'])
+def undo_dataset(dataset_id):
+    dataset_store.undo(dataset_id)
+    return jsonify(dataset_store.info(dataset_id))
+
+@app.route('/datasets/<dataset_id>/redo', methods=['POST'])
+def redo_dataset(dataset_id):
+    dataset_store.redo(dataset_id)
+    return jsonify(dataset_store.info(dataset_id))
+
+@app.route('/datasets/<dataset_id>/checkout/<version_id>', methods=['POST'])
+def checkout_dataset(dataset_id, version_id):
+    dataset_store.checkout(dataset_id, version_id)
+    return jsonify(dataset_store.info(dataset_id))
+
+@app.route('/datasets', methods=['GET'])
+def dataset_store_stats():
+    return jsonify(dataset_store.stats())
+
+@app.route('/chart_cache', methods=['GET'])
+def chart_cache_stats():
+    return jsonify(chart_cache.stats())
+
+# Request headers that change how a route encodes its response, passed on to job runs
+JOB_FORWARDED_HEADERS = ('Accept', 'Accept-Encoding', 'X-Json-Encoder')
+
+def run_route(route, body, headers):
+    # Runs a route in the job's worker thread exactly as if it had been requested directly,
+    # and keeps the finished response (status, headers, body) for /jobs/<id>/result
+    with app.test_request_context(route, method='POST', json=body, headers=headers):
+        response = app.full_dispatch_request()
+        body = response.get_data()
+        headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+        return response.status_code, headers, body
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # Runs any POST route in the background and answers right away with the job id:
+    # {"route": "/outliers_graph", "body": {...the route's usual JSON body...}}
+    route = request.json.get('route')
+    body = request.json.get('body')
+    if not route or body is None:
+        return jsonify({"error": "No route or body provided"}), 400
+    try:
+        endpoint, _ = app.url_map.bind('localhost').match(route, method='POST')
+    except HTTPException:
+        return jsonify({"error": f"No POST route '{route}'"}), 404
+    if endpoint == 'submit_job':
+        return jsonify({"error": "Jobs cannot submit jobs"}), 400
+
+    headers = {name: request.headers[name] for name in JOB_FORWARDED_HEADERS if name in request.headers}
+    job = job_queue.submit(route, run_route, route, body, headers)
+    return jsonify(job.describe()), 202
+
+@app.route('/jobs', methods=['GET'])
+def job_queue_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    return jsonify(job_queue.get(job_id).describe())
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    # Queued jobs never start; running ones stop at their next progress checkpoint
+    return jsonify(job_queue.cancel(job_id).describe())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    # Server-Sent Events: one "data:" message with the job's state whenever it changes,
+    # ending once the job has finished
+    job = job_queue.get(job_id)
+
+    def events():
+        last = None
+        while True:
+            state = job.describe()
+            if state != last:
+                yield f"data: {json.dumps(state)}\n\n"
+                last = state
+            if job.done:
+                return
+            job.wait_for_change(timeout=1)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    # The response the route gave, once the job is done
+    job = job_queue.get(job_id)
+    if job.status == 'failed':
+        return jsonify({"error": job.error}), 500
+    if job.status != 'done':
+        return jsonify({**job.describe(), "error": f"Job is {job.status}"}), 409
+    status, headers, body = job.result
+    return Response(body, status=status, headers=headers)
 
-def apply_letter_casing(data, columns, casing_selections):
-    # Start from the second row (index 1) to skip the header
-    for i in range(len(columns)):
-        casing = casing_selections[i]
-        for j in range(1, len(data)):  # Start loop from 1 to skip the header
-            value = data[j][i]
-            if isinstance(value, str):
-                if casing == 'UPPERCASE':
-                    data[j][i] = value.upper()
-                elif casing == 'lowercase':
-                    data[j][i] = value.lower()
-                elif casing == 'Title Case':
-                    data[j][i] = to_title_case(value)
-                elif casing == 'Sentence case':
-                    data[j][i] = to_sentence_case(value)
-    
-    return data
 
 
 def is_valid_date(value):
@@ -52,59 +360,9 @@ def is_valid_date(value):
     except ValueError:
         return False
 
-def reformat_date(data, date_format, classifications):
-    # Define format mappings for supported date formats
-    format_mappings = {
-        'mm/dd/yyyy': '%m/%d/%Y',
-        'dd/mm/yyyy': '%d/%m/%Y',
-        'yyyy/mm/dd': '%Y/%m/%d',
-    }
-    print(f"reformat_date: Selected Format - {date_format}")
-
-    # Check if the date format is supported
-    if date_format not in format_mappings:
-        raise ValueError(f"Unsupported date format: {date_format}")
-
-    # Get the target format string
-    target_format_str = format_mappings[date_format]
-    print(f"Target Format for output: {target_format_str}")
-
-    # Identify indices of date columns based on classifications
-    date_column_indices = [
-        index for index, classification in enumerate(classifications)
-        if classification[3] == 1  # 1 indicates it's a date column
-    ]
-
-    # Iterate over rows and only process values in date columns
-    for row in data:
-        for col_index in date_column_indices:
-            value = row[col_index]
-            if isinstance(value, str):  # Ensure it's a string
-                print(f"Original Value in Date Column: {value}")
-                parsed_date = None
-
-                # Attempt parsing with each available format
-                for fmt in format_mappings.values():
-                    try:
-                        parsed_date = datetime.strptime(value, fmt)
-                        print(f"Parsed Date with format '{fmt}': {parsed_date}")
-                        break  # Stop if a format successfully parses
-                    except ValueError:
-                        continue  # Continue if parsing fails
-
-                # Reformat if parsing succeeded
-                if parsed_date:
-                    reformatted_date = parsed_date.strftime(target_format_str)
-                    print(f"Reformatted Date: {reformatted_date}")
-                    row[col_index] = reformatted_date
-                else:
-                    print(f"Skipping value '{value}' due to unrecognized date format.")
-
-    return data
-
 @app.route('/apply_date_format', methods=['POST'])
 def apply_date_format_route():
-    data = request.json['data']
+    data = request_table()
     columns = request.json['columns']
     date_formats = request.json['dateFormats']
     classifications = request.json['classifications']
@@ -112,7 +370,7 @@ def apply_date_format_route():
     print(f"Date formats: {date_formats}")
     print(f"classifications: {classifications}")
     result = apply_date_format(data, columns, date_formats, classifications)
-    return jsonify(result)
+    return table_response(result)
 
 def apply_date_format(data, columns, date_formats, classifications):
     # Define format mappings for supported date formats
@@ -124,6 +382,7 @@ def apply_date_format(data, columns, date_formats, classifications):
 
     # Loop over columns and rows to format dates in the specified columns
     for i in range(len(columns)):
+        report_progress(i, len(columns), f"Column {columns[i]}")
         # Check if the column is classified as a date column
         if classifications[i][3] == 1:  # 1 indicates it is a date column
             # Get the date format for this specific column
@@ -163,434 +422,255 @@ def is_valid_date(value, format_str):
 
 
 def count_non_numeric(data, column_index):
-    non_numeric_count = 0
-    for row in data[1:]:  # Skip header row
-        value = row[column_index]
-        # Skip None, empty strings, and NaN values
-        if value is None or value == " " or pd.isna(value) or value =="":
-            continue
-        # Check if the value is non-numeric
-        try:
-            float(value)
-        except (ValueError, TypeError):
-            non_numeric_count += 1
-
-    return non_numeric_count  # Return the count as an integer
+    values = np.array([row[column_index] for row in data[1:]], dtype=object)  # Skip header row
+    # Skip None, empty strings, and NaN values
+    missing = pd.isna(values) | (values == " ") | (values == "")
+    # Count the values that are non-numeric
+    return int((~missing & numeric_invalid_mask(values)).sum())  # Return the count as an integer
 
 def detect_invalid_dates(data, column_index):
-    # Initialize the count of invalid dates
-    invalid_dates_count = 0
-
-    # Define valid date formats
-    valid_date_formats = [
-        '%m-%d-%y',   # MM-DD-YY
-        '%d-%m-%y',   # DD-MM-YY
-        '%Y-%m-%d',   # YYYY-MM-DD
-        '%m/%d/%Y',   # MM-DD-YYYY
-        '%d/%m/%Y',   # DD-MM-YYYY
-        '%b %d, %Y',  # Jan 01, 2020 (month abbreviation, comma)
-        '%b. %d, %Y', # Jan. 01, 2020 (month abbreviation, period, comma)
-        '%B %d, %Y',  # February 01, 2004 (full month name, comma)
+    # Skip the header row and missing values
+    date_values = [
+        str(row[column_index]) for row in data[1:]
+        if row[column_index] is not None and row[column_index] != "" and row[column_index] != " "
     ]
 
-    # Iterate through each row in the data, skipping the header row
-    for row in data[1:]:  # Assuming data[0] is the header row
-        date_value = row[column_index]
-
-        # Skip missing values
-        if date_value is None or date_value == "" or date_value == " ":
-            continue
-
-        is_valid = False
-        for date_format in valid_date_formats:
-            try:
-                # Try parsing the date with the current format
-                datetime.strptime(str(date_value), date_format)
-                is_valid = True
-                break  # Stop checking other formats if valid
-            except ValueError:
-                continue  # Try the next date format
-
-        # If the date is invalid, increment the count
-        if not is_valid:
-            invalid_dates_count += 1
-
     # Return the count of invalid dates for the specified column
-    return invalid_dates_count
-
-def detect_issues(data, columns, classifications):
-    issues = {}
-    missingValuesCount = 0
-    
-    for i in range(len(columns)):
-        column_issues = []
-        column_index = i
-        column_data = [row[column_index] for row in data[1:]]  # Skip header row
-
-        # Count missing values in the column
-        missing_count = sum(1 for value in column_data if pd.isna(value) or value == " " or value == "")
-        missingValuesCount += missing_count
-        if missing_count > 0:
-            column_issues.append(f"Missing Values")
-
-        if classifications[i][0] == 1:  # Numeric column
-            non_numeric_count = count_non_numeric(data, column_index)
-            if non_numeric_count > 0:
-                column_issues.append(f"Non-Numeric Values")
-
-        
-        elif classifications[i][3] == 1:  # Date column
-            invalid_dates_count = detect_invalid_dates(data, column_index)
-            if invalid_dates_count > 0:
-                column_issues.append(f"Invalid Dates")
-
-        if column_issues:
-            issues[columns[i]] = column_issues
-
-    return issues
-
-def map_categorical_values(data, column, unique_values, standard_format):
-    print("Function Invoked: map_categorical_values")
+    parsed = parse_dates(date_values, DETECTION_DATE_FORMATS)
+    return len(parsed) - int(parsed.valid.sum())
 
-    # Prepare the data for DataFrame creation
-    headers = data[0] if isinstance(data[0], list) else []
-    data_rows = data[1:] if len(data) > 1 else []
-
-    # Convert headers and target column name to uppercase for consistency
-    headers = [header for header in headers]
-    column = column
-
-    # Create the DataFrame with uppercase column names
-    df = pd.DataFrame(data_rows, columns=headers)
-
-    # Create the mapping dictionary and print it
-    category_mapping = dict(zip(unique_values, standard_format))
-    print("Category mapping dictionary created:")
-    print(category_mapping)
-
-    # Apply mapping if the column exists in the DataFrame
-    if column in df.columns:
-        df[column] = df[column].map(category_mapping)
-        print(f"DataFrame after applying mapping to column '{column}':")
-    else:
-        print(f"Error: Column '{column}' not found in DataFrame.")
-    
-    print(df)
-
-    # Prepare the result for returning and print it
-    result = [df.columns.tolist()] + df.values.tolist()
-    print("Final result to be returned:")
-    print(result)
-
-    return result
-
-def calculate_iqr_thresholds(series):
-    q1 = series.quantile(0.25)
-    q3 = series.quantile(0.75)
-    iqr = q3 - q1
-    outlier_threshold_lower = q1 - 1.5 * iqr
-    outlier_threshold_upper = q3 + 1.5 * iqr
-    return outlier_threshold_lower, outlier_threshold_upper
-
-
-def choose_outlier_detection_method(df, column):
-    skewness = df[column].skew()
-    is_normal = abs(skewness) < 0.5
-    is_high_dimensional = len(df.columns) > 10
-    is_clustered = len(np.unique(df[column])) > 10
-
-    if is_normal:
-        print("Data is normally distributed. Using Z-score for outlier detection.")
-        return 'Z-score'
-    elif not is_normal and not is_high_dimensional:
-        print("Data is skewed. Using IQR for outlier detection.")
-        return 'IQR'
-    elif is_high_dimensional:
-        print("Data is high-dimensional. Using Isolation Forest for outlier detection.")
-        return 'Isolation Forest'
-    elif is_clustered:
-        print("Data has clusters. Using Local Outlier Factor (LOF) for outlier detection.")
-        return 'LOF'
-    else:
-        print("Using default method: IQR.")
-        return 'IQR'
-
-def choose_xscale(df, column):
-    # Count the number of data points
-    num_points = df[column].count()
-    data_range = df[column].max() - df[column].min()
-    
-    # Check if the data contains negative or zero values
-    has_negatives = (df[column] < 0).any()
-    has_zeros = (df[column] == 0).any()
-
-    # Decide on the scale based on dataset size and properties
-    if has_negatives:
-        # Use 'symlog' if there are negative values
-        return 'symlog'
-    elif has_zeros:
-        # Avoid 'log' if there are zeros
-        return 'symlog' if num_points > 500 else 'linear'
-    else:
-        # Use 'log' if the data spans several orders of magnitude and no zeros/negatives
-        if data_range > 1000 and num_points > 100:
-            return 'log'
-        # For small data ranges or small dataset sizes, use 'linear'
-        return 'linear' if num_points < 100 else 'log'
-    
-def plot_boxen_with_outliers(df, column, method):
-    if method == 'Z-score':
-        z_scores = zscore(df[column])
-        outliers = df[np.abs(z_scores) > 3]
-    elif method == 'IQR':
-        lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
-        outliers = df[(df[column] < lower_limit) | (df[column] > upper_limit)]
-    elif method == 'Isolation Forest':
-        model = IsolationForest()
-        outlier_preds = model.fit_predict(df[[column]])
-        outliers = df[outlier_preds == -1]
-    elif method == 'LOF':
-        model = LocalOutlierFactor()
-        outlier_preds = model.fit_predict(df[[column]])
-        outliers = df[outlier_preds == -1]
-
-    normal_data = df[~df.index.isin(outliers.index)]
-    num_points = len(df)
-    point_size = 10 if num_points > 500 else 30
-    fig_width = 10 if num_points > 500 else 5
-
-    plt.figure(figsize=(fig_width, 6))
-    sns.boxenplot(data=df, x=column, color="green", showfliers=False)
-    sns.scatterplot(data=normal_data, x=column, y=[0] * len(normal_data), color='blue', s=point_size, label='Normal Data')
-    sns.scatterplot(data=outliers, x=column, y=[0] * len(outliers), color='red', s=point_size * 1.5, label='Outliers')
+def detect_issues(data, columns, classifications, caches=None):
+    # Missing / non-numeric / invalid-date checks for all columns in one columnar pass
+    return profile_columns(data, columns, classifications, caches)["issues"]
 
+def plot_boxen_with_outliers(df, column, method, lod_threshold=None, approximate=False, feature_columns=None):
+    outliers = detect_outliers(df, column, method, approximate, feature_columns)
+    outlier_mask = df.index.isin(outliers.index)
     scale = choose_xscale(df, column)
-    plt.xscale(scale)
 
-    plt.title(f'{scale.upper()} Scale Plot for {column} (Total: {num_points} values, {len(outliers)} outliers)')
-
-    # Save the plot to a BytesIO object and return it
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    img.seek(0)
-    plt.close()  # Close the plot to free memory
+    # Rendering happens in the render pool; only the plotted column travels there
+    img = render_pool.render(render_boxen_with_outliers, df[[column]], column, outlier_mask, scale, lod_threshold)
     return img, len(outliers)
 
-def filter_outliers_by_z_score(df, column):
-    lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
-    new_df = df.loc[(df[column] < upper_limit) & (df[column] > lower_limit)]
-    return new_df
-
-def cap_and_floor(df, column):
-    lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
-    df[column] = df[column].apply(
-        lambda x: upper_limit if x > upper_limit else (lower_limit if x < lower_limit else x)
-    )
-    return df
-
-def replace_with_mean(df, column):
-    lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
-    column_mean = df[column].mean()
-    df[column] = df[column].apply(
-        lambda x: column_mean if x > upper_limit or x < lower_limit else x
-    )
-    return df
-
-def replace_with_median(df, column):
-    lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
-    column_median = df[column].median()
-    df[column] = df[column].apply(
-        lambda x: column_median if x > upper_limit or x < lower_limit else x
-    )
-    return df
-
 @app.route('/scale_features', methods=['POST'])
 def scale_features():
-    data = request.json.get('data')
+    data = request_table()
     numerical_columns = request.json.get('numerical_columns')
     scaling_methods = request.json.get('scaling_methods')
 
     df = pd.DataFrame(data[1:], columns=data[0])  # Convert to DataFrame using headers from the first row
 
     # Apply the scaling method for each numerical column
-    for col in numerical_columns:
-        method = scaling_methods.get(col, 'None')
-        if method == 'Normalization':
-            if col in df.columns:
-                df[col] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
-        elif method == 'Standardization':
-            if col in df.columns:
-                df[col] = (df[col] - df[col].mean()) / df[col].std()
-
-    # Convert the DataFrame back to a list of lists, including the column names
-    scaled_data = df.values.tolist()
-    combined_data = [df.columns.tolist()] + scaled_data
+    df = operations.scale_features(df, {'numerical_columns': numerical_columns, 'scaling_methods': scaling_methods})
 
-    return jsonify(combined_data)
+    # The DataFrame is encoded (as a list of lists by default) by table_response
+    return table_response(df)
 
 
 
 
 @app.route('/outliers_graph', methods=['POST'])
 def outliers_graph():
-    data = request.json.get('data')
+    data, caches = request_table_and_caches()
     column_name = request.json.get('column_name')
     task = request.json.get('task')
     method = request.json.get('method')
+    max_iterations = request_max_iterations()
+    tolerance = request_tolerance()
+    lod_threshold = request_lod_threshold()  # rows above which points are aggregated
+    response_format = request.json.get('response_format', 'png')  # 'png' or 'spec'
+    approximate = bool(request.json.get('approximate', False))  # sketch-based quantiles/skew (sketches.py)
+    # Columns IsolationForest/LOF score together, row-wise (default: just column_name)
+    feature_columns = request.json.get('feature_columns') or None
     df = pd.DataFrame(data[1:], columns=data[0])
-
-    outlier_detection_method = choose_outlier_detection_method(df, column_name)
+    if column_name in df.columns and df[column_name].dtype == object:
+        # Numbers sent as text are converted the same way for inline and stored data;
+        # stored datasets reuse the column's cached conversion
+        numbers, valid = numeric_column(df[column_name].to_numpy(dtype=object),
+                                        column_cache_of(data, caches, column_name))
+        if valid.all():
+            df[column_name] = numbers
+
+    # The detection method depends on the column and on the table width
+    cache_key = chart_key(df[column_name], 'outliers_graph', column_name, len(df.columns),
+                          task, method, max_iterations, tolerance, lod_threshold, response_format, approximate,
+                          feature_columns)
+    if feature_columns and any(column not in df.columns for column in feature_columns):
+        return jsonify({"error": "feature_columns must name columns of the dataset"}), 400
+    if feature_columns:
+        # The plotted column alone does not identify the chart any more
+        cache_key = chart_key(pd.util.hash_pandas_object(df[feature_columns], index=False), cache_key)
+    if response_format == 'spec':
+        return outliers_spec_response(cache_key, df, column_name, task, method, max_iterations, tolerance, approximate,
+                                      feature_columns)
+    cached = cached_png_response(cache_key, download_name='outliers.png')
+    if cached is not None:
+        return cached
+
+    outlier_detection_method = choose_outlier_detection_method(df, column_name, approximate)
     outliers_count = 1
     filtered_outliers = df.copy()
+    headers = {}
 
     if(task == "Show Outliers" and method == ""):
-        img, outliers_count = plot_boxen_with_outliers(df, column_name, outlier_detection_method)
+        img, outliers_count = plot_boxen_with_outliers(
+            df, column_name, outlier_detection_method, lod_threshold, approximate, feature_columns
+        )
         print(f"Outliers: {outliers_count}")
 
     elif task == "Resolve Outliers":
-        while outliers_count != 0:
-            if method == "Remove":
-                filtered_outliers = filter_outliers_by_z_score(filtered_outliers, column_name)
-            elif method == "Cap and Floor":
-                filtered_outliers = cap_and_floor(filtered_outliers, column_name)
-            elif method == "Replace with Mean":
-                filtered_outliers = replace_with_mean(filtered_outliers, column_name)
-            elif method == "Replace with Median":
-                filtered_outliers = replace_with_median(filtered_outliers, column_name)
-            
-            img, outliers_count = plot_boxen_with_outliers(filtered_outliers, column_name, outlier_detection_method)
-    
-    return send_file(img, mimetype='image/png', as_attachment=True, download_name='outliers.png')
+        filtered_outliers, report = resolve_outliers(
+            filtered_outliers, column_name, method, outlier_detection_method, max_iterations, tolerance, approximate,
+            feature_columns
+        )
+        print(f"Resolve Outliers: {report}")
+
+        # Render only the converged result
+        img, outliers_count = plot_boxen_with_outliers(
+            filtered_outliers, column_name, outlier_detection_method, lod_threshold, approximate, feature_columns
+        )
+        headers = {
+            'X-Outlier-Iterations': str(report["iterations"]),
+            'X-Rows-Affected': str(report["rows_affected"]),
+            'X-Outliers-Remaining': str(outliers_count),
+            'X-Converged': str(report["converged"]).lower(),
+        }
+
+    png, headers = chart_cache.put(cache_key, img.getvalue(), headers)
+    return png_response(cache_key, png, headers, download_name='outliers.png')
+
+def outliers_spec_response(cache_key, df, column_name, task, method, max_iterations, tolerance, approximate=False,
+                           feature_columns=None):
+    # Data the client needs to draw the outlier chart itself; nothing is rendered
+    if request.if_none_match.contains(cache_key):
+        return spec_response(cache_key, {})
+
+    outlier_detection_method = choose_outlier_detection_method(df, column_name, approximate)
+    report = None
+    if task == "Resolve Outliers":
+        df, report = resolve_outliers(
+            df.copy(), column_name, method, outlier_detection_method, max_iterations, tolerance, approximate,
+            feature_columns
+        )
+
+    outliers = detect_outliers(df, column_name, outlier_detection_method, approximate, feature_columns)
+    outlier_mask = df.index.isin(outliers.index)
+    thresholds = calculate_iqr_thresholds(df[column_name], approximate) if outlier_detection_method == 'IQR' else None
+    spec = outliers_spec(df, column_name, outlier_mask, choose_xscale(df, column_name), thresholds)
+    spec["method"] = outlier_detection_method
+    spec["resolution"] = report
+    return spec_response(cache_key, spec)
 
 @app.route('/get_cleaned_file', methods=['POST'])
 def get_cleaned_file():
-    data = request.json.get('data')
+    data, caches = request_table_and_caches()
     column_name = request.json.get('column_name')
     task = request.json.get('task')
     method = request.json.get('method')
 
     df = pd.DataFrame(data[1:], columns=data[0])
-    outlier_detection_method = choose_outlier_detection_method(df, column_name)
-    filtered_outliers = df.copy()
+
+    column_names = request.json.get('column_names')
+    if column_names and task == "Resolve Outliers":
+        # Several columns in one vectorized pass; "Remove" filters rows once for all of them
+        return table_response(operations.resolve_outliers_columns(df, {
+            'columns': column_names, 'method': method,
+            'threshold_method': request.json.get('threshold_method', 'IQR'),
+            'approximate': request.json.get('approximate', False),
+        }))
 
     # Apply the selected outlier removal method
-    if task == "Resolve Outliers":
-        if method == "Remove":
-            filtered_outliers = filter_outliers_by_z_score(filtered_outliers, column_name)
-        elif method == "Cap and Floor":
-            filtered_outliers = cap_and_floor(filtered_outliers, column_name)
-        elif method == "Replace with Mean":
-            filtered_outliers = replace_with_mean(filtered_outliers, column_name)
-        elif method == "Replace with Median":
-            filtered_outliers = replace_with_median(filtered_outliers, column_name)
-    
-    # Convert cleaned data to a list of lists (for JSON serialization)
-    cleaned_data = [filtered_outliers.columns.tolist()] + filtered_outliers.values.tolist()
-    
+    filtered_outliers = operations.get_cleaned_file(df, {
+        'task': task, 'column_name': column_name, 'method': method,
+        'approximate': request.json.get('approximate', False),
+    })
+
     # Return both the cleaned data and the column names
-    
-    return jsonify(cleaned_data)
+    return table_response(filtered_outliers)
 
 @app.route('/map_categorical_values', methods=['POST'])
 def map_categorical_values_route():
-    data = request.json.get('data')
+    data = request_table()
     column = request.json.get('column')
     unique_values = request.json.get('unique_values')
     standard_format = request.json.get('standard_format')
 
-    # Call the mapping function and print the result for debugging
-    result = map_categorical_values(data, column, unique_values, standard_format)
-    print(f"Result of mapping: {result}")
+    # Create the DataFrame and apply the mapping
+    df = pd.DataFrame(data[1:], columns=data[0])
+    df = operations.map_categorical_values(
+        df, {'column': column, 'unique_values': unique_values, 'standard_format': standard_format}
+    )
 
-    return jsonify(result)
+    return table_response(df)
 
 @app.route('/delete_invalid_dates', methods=['POST'])
 def delete_invalid_dates():
-    data = request.json['data']
+    data = request_table()
     date_format = request.json['dateFormat']  # Expected format for valid dates
     classifications = request.json['classifications']
     
-    # Define format mappings for supported date formats
-    format_mappings = {
-        'mm/dd/yyyy': '%m/%d/%Y',
-        'dd/mm/yyyy': '%d/%m/%Y',
-        'yyyy/mm/dd': '%Y/%m/%d',
-    }
-
-    # Map date_format to the correct format string
-    if date_format not in format_mappings:
-        return jsonify({"error": f"Unsupported date format: {date_format}"}), 400
-
-    # Set the target format string and additional formats to check
-    target_format_str = format_mappings[date_format]
-    alternative_formats = list(format_mappings.values())
-
-    # Assume the first row is the header
-    header = data[0]
-    rows = data[1:]  # All rows except the header
-    valid_data = [header]  # Start valid_data with the header
-
-    # Identify indices of date columns based on classifications
-    date_column_indices = [
-        index for index, classification in enumerate(classifications)
-        if classification[3] == 1  # 1 indicates it is a date column
-    ]
-
-    for row in rows:
-        row_valid = True  # Assume row is valid initially
-        for col_index in date_column_indices:
-            value = row[col_index]
-            if isinstance(value, str) and value.strip():  # Ensure it's a non-empty string
-                valid_date = False
-
-                # First, try parsing with the target format
-                try:
-                    datetime.strptime(value, target_format_str)
-                    valid_date = True
-                except ValueError:
-                    # If the target format fails, try alternative formats
-                    for fmt in alternative_formats:
-                        try:
-                            datetime.strptime(value, fmt)
-                            valid_date = True
-                            break
-                        except ValueError:
-                            continue
-                
-                # If no valid date format matches, mark the row as invalid
-                if not valid_date:
-                    print(f"Invalid date found: {value} in row {row}")
-                    row_valid = False
-                    break  # Stop checking further columns in this row
-        if row_valid:
-            valid_data.append(row)  # Only add rows that passed the check
-
-    reformat_dates = reformat_date(valid_data, date_format, classifications)
-    return jsonify(reformat_dates)
+    # Drop rows with invalid dates, then reformat the remaining dates
+    df = operations.delete_invalid_dates(
+        table_to_frame(data), {'dateFormat': date_format, 'classifications': classifications}
+    )
+    return table_response(df)
 
 @app.route('/apply_letter_casing', methods=['POST'])
 def apply_letter_casing_route():
-    data = request.json['data']
+    data = request_table()
     columns = request.json['columns']
     casing_selections = request.json['casingSelections']
-    result = apply_letter_casing(data, columns, casing_selections)
-    return jsonify(result)
+    df = operations.apply_letter_casing(
+        table_to_frame(data), {'columns': columns, 'casingSelections': casing_selections}
+    )
+    return table_response(df)
 
 
 
 @app.route('/detect_issues', methods=['POST'])
 def detect_issues_route():
-    data = request.json['data']
     columns = request.json['columns']
     classifications = request.json['classifications']
-    result = detect_issues(data, columns, classifications)
+    dataset_id = request.json.get('dataset_id')
+    if dataset_id:
+        # Stored datasets are profiled straight from the frame, reusing typed columns
+        # of the same version
+        data, caches, _ = dataset_store.snapshot(dataset_id)
+    else:
+        data = request.json.get('data')
+        caches = None
+    if request.json.get('stream'):
+        # One record per column as soon as it is profiled (in completion order), then a summary
+        include_profile = bool(request.json.get('include_profile'))
+        return stream_records_response(
+            streamed_issues(data, columns, classifications, caches, include_profile)
+        )
+    if request.json.get('include_profile'):
+        # Issues plus per-column counts and timings
+        return jsonify(profile_columns(data, columns, classifications, caches))
+    result = detect_issues(data, columns, classifications, caches)
     return jsonify(result)
 
+def streamed_issues(data, columns, classifications, caches, include_profile):
+    started = time.perf_counter()
+    try:
+        for position, issues, counts in iter_profiled_columns(data, columns, classifications, caches):
+            record = {"column": columns[position], "index": position, "issues": issues}
+            if include_profile:
+                record["profile"] = counts
+            yield record
+    except Exception as e:
+        # The status line is long gone, so the failure is reported as the last record
+        print(f"Error: {e}")
+        yield {"error": str(e)}
+        return
+    yield {"done": True, "seconds": time.perf_counter() - started}
+
 @app.route('/remove_columns', methods=['POST'])
 def remove_columns():
     print('REMOVE COLUMNS')
     try:
-        data = request.json.get('data')
+        data = request_table()
         columns = request.json.get('columns')
         columns_to_remove = request.json.get('columnsToRemove', [])
 
@@ -599,37 +679,83 @@ def remove_columns():
         if not columns_to_remove:
             return jsonify({'error': 'No columns specified to remove'}), 400
 
+        dataset_id = request.json.get('dataset_id')
+        duplicated = None
+        if dataset_id:
+            # Stored datasets reuse the duplicate row index of their current version; the table
+            # is re-read with it so both come from the same version
+            frame, index, g.dataset_version = dataset_store.frame_and_row_index(dataset_id)
+            data, duplicated = frame_to_table(frame), index.duplicated
+
         # Convert the JSON data to a DataFrame
         df = pd.DataFrame(data[1:], columns=columns)
 
-        # Drop duplicates
-        df = df.drop_duplicates()
-
-        # Remove the specified columns
-        df_cleaned = df.drop(columns=columns_to_remove)
+        if duplicated is not None:
+            df_cleaned = operations.drop_columns(df[~duplicated], {'columns': columns_to_remove})
+        else:
+            # Drop duplicates and remove the specified columns
+            df_cleaned = operations.remove_columns(df, {'columnsToRemove': columns_to_remove})
 
         # Convert the cleaned DataFrame back to JSON
-        result_data = [df_cleaned.columns.tolist()] + df_cleaned.values.tolist()
-        return jsonify(result_data)
+        return table_response(df_cleaned)
 
+    except (DatasetNotFound, OperationError):
+        raise
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def duplicate_index():
+    # Duplicate row index over the requested columns (all when none are given), with the
+    # table it was built from
+    columns = request.json.get('columns') or None
+    dataset_id = request.json.get('dataset_id')
+    try:
+        if dataset_id:
+            frame, index, g.dataset_version = dataset_store.frame_and_row_index(dataset_id, columns)
+            return frame, index
+        data = request.json.get('data')
+        if not data:
+            raise OperationError("No data provided")
+        frame = table_to_frame(data)
+        return frame, row_index(frame, columns)
+    except DatasetNotFound:
+        raise
+    except KeyError as e:
+        raise OperationError(str(e.args[0]))
+
+@app.route('/duplicates_report', methods=['POST'])
+def duplicates_report():
+    # Duplicate row and group counts without copying the table
+    limit = int(request.json.get('limit', 10))
+    _, index = duplicate_index()
+    return jsonify(index.report(limit))
+
+@app.route('/dedupe', methods=['POST'])
+def dedupe_route():
+    # Keeps the first row of each duplicate group over "columns" (all columns when omitted)
+    frame, index = duplicate_index()
+    df = table_to_frame(frame_to_table(frame))
+    return table_response(df[~index.duplicated])
+
 @app.route('/reformat_date', methods=['POST'])
 def reformat_date_route():
     try:
-        data = request.json['data']
+        data = request_table()
         date_formats = request.json['dateFormats']
         classifications = request.json['classifications']
-        result = reformat_date(data, date_formats, classifications)  # Assuming you want the first date format
-        return jsonify(result)
+        result = operations.reformat_date(
+            table_to_frame(data), {'dateFormats': date_formats, 'classifications': classifications}
+        )  # Assuming you want the first date format
+        return table_response(result)
+    except DatasetNotFound:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/show_invalid_dates', methods=['POST'])
 def show_invalid_dates():
-    data = request.json['data']
+    data = request_table()
     date_format = request.json['dateFormat']  # Get the user-specified date format
     classifications = request.json['classifications']
     column_index = request.json['columnIndex']  # Get the specific column to check
@@ -649,84 +775,32 @@ def show_invalid_dates():
     # Get the correct format string for the user's choice
     target_format_str = format_mappings[date_format]
     print(f"Target Format for Validation: {target_format_str}")  # Print the target format to debug
-    invalid_dates = []
-
-    # Iterate through the dataset and check the specific column, ignoring the first row
-    for index, row in enumerate(data):
-        if index == 0:  # Skip the first row (assumed to be the header)
-            continue
-
-        value = row[column_index]
-        if isinstance(value, str) and value.strip():  # Ensure it's a non-empty string
-            try:
-                # Try parsing the date using the user's chosen format
-                parsed_date = datetime.strptime(value, format_mappings[date_format])  # Use the chosen format
-                formatted_date = parsed_date.strftime(target_format_str)  # Format date to target format
-                row[column_index] = formatted_date
-            except ValueError:
-                # If parsing fails, mark it as invalid
-                invalid_dates.append({
-                    "invalid_date": value,
-                    "expected_format": target_format_str
-                })
+    # Check the specific column, ignoring the first row (assumed to be the header)
+    values = [row[column_index] for row in data[1:]]
+    checked = np.array([isinstance(value, str) and bool(value.strip()) for value in values], dtype=bool)
+    parsed = parse_dates(values, [target_format_str])  # Use the chosen format
+
+    # Non-empty strings that fail to parse are reported as invalid
+    invalid_dates = [
+        {"invalid_date": values[i], "expected_format": target_format_str}
+        for i in np.flatnonzero(checked & ~parsed.valid)
+    ]
 
     # Return invalid dates in the specified format
     return jsonify({"invalid_dates": invalid_dates})
 
 @app.route('/reformat_column', methods=['POST'])
 def reformat_column():
-    data = request.json['data']
+    data = request_table()
     date_format = request.json['dateFormat']  
     classifications = request.json['classifications']
     column_index = request.json['columnIndex']  # Get the column to reformat
 
-    # Define format mappings for supported date formats
-    format_mappings = {
-        'mm/dd/yyyy': '%m/%d/%Y',
-        'dd/mm/yyyy': '%d/%m/%Y',
-        'yyyy/mm/dd': '%Y/%m/%d',
-    }
-
-    # Ensure the chosen date format is supported
-    if date_format not in format_mappings:
-        return jsonify({"error": f"Unsupported date format: {date_format}"}), 400
-
-    target_format_str = format_mappings[date_format]
-
-    # Create a list of indices to delete invalid rows
-    invalid_row_indices = []
-
-    # Iterate over the data and reformat the selected column
-    for index, row in enumerate(data):
-        if index == 0:  # Skip the first row (assumed to be the header)
-            continue
-
-        value = row[column_index]
-        if isinstance(value, str) and value.strip():
-            try:
-                # Try parsing the date using multiple formats
-                parsed_date = None
-                for fmt in format_mappings.values():
-                    try:
-                        parsed_date = datetime.strptime(value, fmt)
-                        break
-                    except ValueError:
-                        continue
-
-                if parsed_date:
-                    # If parsing is successful, reformat the date
-                    row[column_index] = parsed_date.strftime(target_format_str)
-                else:
-                    # Mark row for deletion if date is invalid
-                    invalid_row_indices.append(index)
-            except ValueError:
-                # Mark row for deletion if parsing fails
-                invalid_row_indices.append(index)
-
-    # Delete rows with invalid dates
-    data = [row for index, row in enumerate(data) if index not in invalid_row_indices]
-
-    return jsonify(data)
+    # Reformat the selected column and delete rows with invalid dates
+    df = operations.reformat_column(
+        table_to_frame(data), {'dateFormat': date_format, 'columnIndex': column_index}
+    )
+    return table_response(df)
 
 
 @app.route('/non_categorical_missing_values', methods=['POST'])
@@ -736,7 +810,7 @@ def process_data():
     column_name = data.get('column')
     action = data.get('action')
     fill_value = data.get('fillValue')
-    dataset = data.get('data')
+    dataset = request_table()
     print(f"Fill value: {fill_value}")
 
     if not dataset:
@@ -745,53 +819,13 @@ def process_data():
     # Create a DataFrame, no replacement of empty strings with NaN
     df = pd.DataFrame(dataset[1:], columns=dataset[0])
 
-    if column_name not in df.columns:
-        return jsonify({"error": "Column not found"}), 400
+    if action == "Leave Blank" and column_name in df.columns:
+        return table_response(dataset)
 
-    if action == "Remove Rows":
-        print(f"Action: Remove Rows for column: {column_name}")
-        
-        # Filter out rows where the column contains empty strings or spaces
-        cleaned_df = df[df[column_name].str.strip().ne('')]  # Remove rows with empty or space-only strings
-        cleaned_data = [list(cleaned_df.columns)] + cleaned_df.values.tolist()
-        print(f"Cleaned data: {cleaned_data}")
-        return jsonify(cleaned_data)
-
-    elif action == "Fill with":
-        # Check if fill_value is valid (not None or empty)
-        if fill_value is None or fill_value == "":
-            return jsonify({"error": "Fill value cannot be None or empty"}), 400
-        
-        print(f"Before fill operation: {df[column_name]}")
+    print(f"Action: {action} for column: {column_name}")
+    df = operations.non_categorical_missing_values(df, data)
+    return table_response(df)
 
-        # Apply fill operation to the correct column (handle empty strings)
-        if df[column_name].dtype == 'object':  # If the column is of type object (e.g., string)
-            df[column_name] = df[column_name].replace('', fill_value)  # Replace empty strings with fill_value
-            df[column_name] = df[column_name].replace(' ', fill_value)  # Replace spaces with fill_value
-        
-        print(f"After fill operation: {df[column_name]}")
-        
-        # Prepare the response with the updated data
-        filled_data = [list(df.columns)] + df.values.tolist()
-        print(f"Filled data: {filled_data}")
-        return jsonify(filled_data)
-
-    elif action == "Fill with Mode":
-        print("Action: Fill with Mode")
-        mode_value = df[column_name].mode().iloc[0] if not df[column_name].mode().empty else ""
-        print(f"Mode Value for {column_name}: {mode_value}")
-        
-        # Replace empty strings in the column with mode value
-        df[column_name] = df[column_name].replace('', mode_value)
-        
-        filled_data = [list(df.columns)] + df.values.tolist()
-        return jsonify(filled_data)
-
-    elif action == "Leave Blank":
-        return jsonify(dataset)
-
-    else:
-        return jsonify({"error": "Invalid action"}), 400
 
 
 
@@ -861,120 +895,97 @@ def numerical_missing_values():
         data = request.json
         column_name = data.get('column')
         action = data.get('action')
-        fill_value = data.get('fillValue')
-        dataset = data.get('data')
+        dataset, caches = request_table_and_caches()
 
         if not dataset or not column_name or not action:
             return jsonify({"error": "Missing required fields"}), 400
 
-        # Convert dataset to DataFrame
+        # Convert dataset to DataFrame and fill, drop or leave the missing values
         df = pd.DataFrame(dataset[1:], columns=dataset[0])
-        df[column_name] = pd.to_numeric(df[column_name], errors='coerce')  # Convert column to numeric, non-numeric to NaN
-
-        # Calculate mean, median, and mode ignoring NaN values
-        mean_value = df[column_name].mean()
-        median_value = df[column_name].median()
-        try:
-            mode_value = mode(df[column_name].dropna())
-        except StatisticsError:
-            mode_value = None  # Handle case where mode cannot be determined
-
-        # Handle the selected action
-        if action == "Fill/Replace with Mean":
-            df[column_name] = df[column_name].fillna(mean_value)
-        elif action == "Fill/Replace with Median":
-            df[column_name] = df[column_name].fillna(median_value)
-        elif action == "Fill/Replace with Mode" and mode_value is not None:
-            df[column_name] = df[column_name].fillna(mode_value)
-        elif action == "Fill/Replace with Custom Value":
-            try:
-                custom_value = float(fill_value)
-                df[column_name] = df[column_name].fillna(custom_value)
-            except ValueError:
-                return jsonify({"error": "Custom value must be a numeric value"}), 400
-        elif action == "Remove Rows":
-            df = df.dropna(subset=[column_name])
-        elif action == "Leave Blank":
-            # Do nothing, leave the values as they are
-            pass
-        else:
-            return jsonify({"error": "Invalid action"}), 400
-
-        # Replace NaN with None for JSON serialization
-        cleaned_data = [list(df.columns)] + df.where(pd.notnull(df), None).values.tolist()
-
-        return jsonify(cleaned_data)
-
+        cache = column_cache_of(dataset, caches, column_name)
+        if cache is not None:
+            # The stored column's cached to_numeric conversion: exactly what the operation
+            # would compute, so inline and stored data give the same result
+            numbers = coerced_numeric_column(df[column_name], cache)
+            df[column_name] = numbers.copy()  # the cached array is shared; never fill it in place
+        return table_response(operations.numerical_missing_values(df, data))
+
+    except (DatasetNotFound, OperationError):
+        raise
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({"error": str(e)}), 500
     
-def generate_chart(column_name, column_data, classification):
-    chart_type = None
-    if classification[0] == 1:
-        chart_type = 'numerical'
-    elif classification[1] == 1:
-        chart_type = 'categorical'
-    elif classification[2] == 1:
-        chart_type = 'non-categorical'
-    elif classification[3] == 1:
-        chart_type = 'date'
-
-    # Create the appropriate plot based on classification
-    fig, ax = plt.subplots()
-
-    if chart_type == 'numerical':
-        # Ensure only valid numeric entries
-        column_data = [
-            float(i) if isinstance(i, (int, float)) else None
-            for i in column_data if i != '' and i is not None
-        ]
-        # Remove any None values
-        column_data = [i for i in column_data if i is not None]
-        
-        ax.hist(column_data, bins=20, edgecolor='black')  # You can adjust the number of bins
-        ax.set_title(f"Numerical Data: {column_name}")
-        ax.set_xlabel('Value')
-        ax.set_ylabel('Frequency')
-
-    elif chart_type == 'categorical':
-        column_data = column_data[1:]
-        # Count the occurrences of each category
-        category_counts = pd.Series(column_data).value_counts()
-        
-        # Plot as a pie chart
-        ax.pie(category_counts, labels=category_counts.index, autopct='%1.1f%%', startangle=90)
-        ax.set_title(f"Categorical Data: {column_name}")
-        ax.axis('equal')
-
-    elif chart_type == 'non-categorical':
-        # Count the non-empty values and missing (null/empty) values
-        non_empty_values = [val for val in column_data if val != '' and val is not None]
-        missing_values = len(column_data) - len(non_empty_values)
-
-        ax.bar(['Non-Empty', 'Missing'], [len(non_empty_values), missing_values])
-        ax.set_title(f"Non-Categorical Data: {column_name}")
-        ax.set_ylabel('Count')
-
-    elif chart_type == 'date':
-        dates = pd.to_datetime(column_data, errors='coerce')
-        
-        if dates.isnull().all():
-            ax.text(0.5, 0.5, "No valid dates available", ha='center', va='center', fontsize=12)
-        else:
-            # Use a line plot instead of scatter
-            ax.plot(dates, range(len(dates)), linestyle='-', color='teal', marker='o')
-            ax.set_title(f"Date Data: {column_name}")
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Index')
-
-    # Save the plot to a byte stream
-    img_stream = io.BytesIO()
-    fig.savefig(img_stream, format='png')
-    img_stream.seek(0)
-    plt.close(fig)
+@app.route('/pipeline', methods=['POST'])
+def pipeline():
+    # Runs an ordered list of cleaning steps on one in-memory DataFrame:
+    # {"steps": [{"operation": "remove_columns", "params": {"columnsToRemove": [...]}}, ...]}
+    data = request_table()
+    steps = request.json.get('steps')
+    if not data or not steps:
+        return jsonify({"error": "No data or steps provided"}), 400
 
-    return img_stream
+    df = pd.DataFrame(data[1:], columns=data[0])
+    if request.json.get('lazy'):
+        # Let the planner reorder, fuse and prune the steps before running them
+        df, report = lazy_plan(data[0], steps).execute(df)
+    else:
+        df, report = run_pipeline(df, steps)
+
+    dataset_id = request.json.get('dataset_id')
+    if dataset_id:
+        payload = commit_stored_dataset(dataset_id, df, 'pipeline')
+        if "dataset" not in payload:
+            payload = {"dataset": payload}
+        return jsonify({**payload, "steps": report})
+    return jsonify({"data": frame_to_table(df), "steps": report})
+
+def lazy_plan(columns, steps):
+    plan = LazyPlan(columns)
+    for step in steps:
+        plan.add(step.get('operation'), step.get('params', {}))
+    return plan
+
+def data_dir_path(path):
+    # Resolve a client-supplied path and refuse anything outside data_dir
+    root = os.path.realpath(data_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if not resolved.startswith(root + os.sep):
+        raise OperationError(f"Path '{path}' is outside the data directory")
+    return resolved
+
+@app.route('/chunked_pipeline', methods=['POST'])
+def chunked_pipeline():
+    # Runs pipeline steps over a CSV on local disk in bounded memory:
+    # {"input_path": "big.csv", "output_path": "big_clean.csv", "steps": [...], "chunk_size": 100000}
+    if not data_dir:
+        return jsonify({"error": "Chunked execution is disabled (DATASWEEP_DATA_DIR is not set)"}), 403
+    input_path = request.json.get('input_path')
+    output_path = request.json.get('output_path')
+    steps = request.json.get('steps')
+    if not input_path or not output_path or not steps:
+        return jsonify({"error": "No input_path, output_path or steps provided"}), 400
+
+    input_path = data_dir_path(input_path)
+    if not os.path.isfile(input_path):
+        return jsonify({"error": "Input file not found"}), 404
+    chunk_size = int(request.json.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    summary = run_chunked(input_path, data_dir_path(output_path), steps, max(1, chunk_size))
+    summary["output_path"] = request.json.get('output_path')  # relative to the data directory
+    return jsonify(summary)
+
+@app.route('/pipeline/explain', methods=['POST'])
+def pipeline_explain():
+    # Shows how a lazy pipeline would run, without running it. Only the header is needed,
+    # so "columns" can be sent instead of the data.
+    columns = request.json.get('columns')
+    if columns is None:
+        data = request_table()
+        columns = data[0] if data else None
+    steps = request.json.get('steps')
+    if not columns or not steps:
+        return jsonify({"error": "No columns or steps provided"}), 400
+    return jsonify(lazy_plan(columns, steps).explain())
 
 @app.route('/generate-chart', methods=['POST'])
 def generate_chart_endpoint():
@@ -983,6 +994,8 @@ def generate_chart_endpoint():
     columns = request.json.get('columns')
     classifications = request.json.get('classifications')
     column_name = request.json.get('column_name')
+    if request.json.get('dataset_id'):
+        data = {"csv_data": request_table()}
 
     # Check the structure of 'data'
     if isinstance(data, str):  # If data is a string, parse it
@@ -999,19 +1012,35 @@ def generate_chart_endpoint():
         column_data = [row[column_index] for row in data.get("csv_data", [])]
         classification = classifications[column_index]
 
+        lod_threshold = request_lod_threshold()  # rows above which points are aggregated
+        response_format = request.json.get('response_format', 'png')  # 'png' or 'spec'
+        cache_key = chart_key(column_data, 'generate-chart', column_name, classification, lod_threshold, response_format)
+        if response_format == 'spec':
+            # Pre-aggregated chart data for the client to draw
+            if request.if_none_match.contains(cache_key):
+                return spec_response(cache_key, {})
+            return spec_response(cache_key, chart_spec(column_name, column_data, classification, lod_threshold))
+        cached = cached_png_response(cache_key)
+        if cached is not None:
+            return cached
+
         # Generate the chart
-        img = generate_chart(column_name, column_data, classification)
-        return send_file(img, mimetype='image/png')
+        img = render_pool.render(generate_chart, column_name, column_data, classification, lod_threshold)
+        png, headers = chart_cache.put(cache_key, img.getvalue())
+        return png_response(cache_key, png, headers)
     else:
         print("Missing parameters.")
         return "Missing parameters", 400
 
 @app.route('/calculate-statistics', methods=['POST'])
 def calculate_statistics():
-    # Ensure that the data is parsed as JSON into a Python dictionary
-    data = request.json.get('data')  # Assuming the data is under 'csv_data'
     columns = request.json.get('columns')
     classifications = request.json.get('classifications')
+    approximate = bool(request.json.get('approximate', False))  # sketch-based median (sketches.py)
+    dataset_id = request.json.get('dataset_id')
+    if request.json.get('all_columns'):
+        return all_column_statistics(columns, classifications, approximate, dataset_id)
+
     column_name = request.json.get('column_name')
     # Ensure the column_name exists in the columns list
     if column_name not in columns:
@@ -1019,76 +1048,84 @@ def calculate_statistics():
 
     # Find the index of the column in the columns list
     column_index = columns.index(column_name)
-
-    column_data = [row[column_index] for row in data[1:]] 
-
     classification = classifications[column_index]
 
+    if dataset_id:
+        payload, status = stored_column_statistics(dataset_id, column_index, classification, approximate)
+    else:
+        data = request.json.get('data')
+        payload, status = column_statistics(inline_column(data, column_index), classification, approximate)
+    return jsonify(payload), status
+
+def inline_column(data, column_index):
+    column_data = np.empty(len(data) - 1, dtype=object)
+    column_data[:] = [row[column_index] for row in data[1:]]
+    return column_data
+
+def stored_column_statistics(dataset_id, column_index, classification, approximate):
+    column_data, cache = dataset_store.column(dataset_id, column_index)
+    return cached_column_statistics(column_data, cache, classification, approximate)
+
+def cached_column_statistics(column_data, cache, classification, approximate):
+    # Stored datasets keep the statistics with the column's version, so they are
+    # only recomputed after an operation changes this column
+    key = ('statistics', tuple(classification), approximate)
+    if key not in cache:
+        cache[key] = column_statistics(column_data, classification, approximate, cache)
+    return cache[key]
+
+def all_column_statistics(columns, classifications, approximate, dataset_id):
+    # "Profile all columns": statistics for every column, as one response keyed by column
+    # name or, with "stream": true, one record per column as soon as it is computed
+    if not columns or not classifications or len(classifications) < len(columns):
+        return jsonify({"error": "A classification is needed for every column"}), 400
+    if dataset_id:
+        # Every column of one version, taken up front: a stream never mixes versions and
+        # does not depend on the dataset staying in the store (404 before streaming starts)
+        frame, caches, _ = dataset_store.snapshot(dataset_id)
+        if frame.shape[1] < len(columns):
+            return jsonify({"error": "More columns requested than the dataset has"}), 400
+        tasks = [(frame.iloc[:, i].to_numpy(dtype=object), caches[i], classifications[i], approximate)
+                 for i in range(len(columns))]
+        statistics_fn = cached_column_statistics
+    else:
+        data = request.json.get('data')
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        tasks = [(inline_column(data, i), classifications[i], approximate) for i in range(len(columns))]
+        statistics_fn = column_statistics
 
-    if classification[2] == 1:  # non-categorical
-
-        non_empty_values = [value for value in column_data if value != '' and value is not None]
-        missing_values = len(column_data) - len(non_empty_values)
-        return jsonify({
-            "non_empty_count": len(non_empty_values),
-            "missing_count": missing_values
-        })
-    
-    if classification[3] == 1:  # date
-        # No statistics to calculate for date type
-        return jsonify({
-            "message": "No statistics available for date type."
-        })
-    
-    if classification[0] == 1:  # numerical
-    # Try to convert the column data to numerical values (float), skipping invalid or missing values
-        column_data_filtered = []
-        for value in column_data:
-            try:
-                # Attempt to convert each value to a float, and skip invalid ones
-                numeric_value = float(value)
-                column_data_filtered.append(numeric_value)
-            except (ValueError, TypeError):
-                # Skip invalid values (e.g., strings, None, or empty values)
-                continue
-        
-        # Debugging: Print the filtered data
-
-        # Check if column_data_filtered is empty after filtering
-        if not column_data_filtered:
-            return jsonify({"error": "No valid numeric data found in column"}), 400
-        
-        # Calculate statistics (mean, median, mode)
-        mean = np.mean(column_data_filtered)
-        median = np.median(column_data_filtered)
+    def records():
+        started = time.perf_counter()
         try:
-            mode = statistics.mode(column_data_filtered)
-        except statistics.StatisticsError:
-            mode = "No unique mode"
-        
-        return jsonify({
-            "mean": mean,
-            "median": median,
-            "mode": mode
-        })
-
-
-    if classification[1] == 1:  # categorical
-        # For categorical data, calculate the mode and count of each unique value
-        mode = statistics.mode(column_data) if column_data else None
-        value_counts = {value: column_data.count(value) for value in set(column_data)}
-        
-        return jsonify({
-            "mode": mode,
-            "value_counts": value_counts
-        })
-    
-    # Default return if no matching classification
+            for position, (payload, status) in iter_completed(statistics_fn, tasks):
+                yield {"column": columns[position], "index": position, "status": status, "statistics": payload}
+        except Exception as e:
+            # The status line is long gone, so the failure is reported as the last record
+            print(f"Error: {e}")
+            yield {"error": str(e)}
+            return
+        yield {"done": True, "seconds": time.perf_counter() - started}
+
+    if request.json.get('stream'):
+        return stream_records_response(records())
+    results = {}
+    for record in records():
+        if "error" in record:
+            return jsonify({"error": record["error"]}), 500
+        if "column" in record:
+            results[record["column"]] = record
     return jsonify({
-        "error": "Invalid column classification"
+        "columns": {
+            name: {"status": results[name]["status"], "statistics": results[name]["statistics"]}
+            for name in columns
+        },
     })
 
-
 if __name__ == '__main__':
+    # Development server; see serve.py for production serving
+    # Warm the render workers in the serving process only, not in the reloader's watcher
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        render_pool.start()
 
     app.run(host='0.0.0.0', port=5000, debug=True)
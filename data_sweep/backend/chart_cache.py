@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def chart_key(values, *params):
+    """Content hash of a chart's input column plus the parameters that shape the chart."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if series.dtype == object:
+        # repr keeps 1, 1.0 and '1' apart, which matters for the numeric filters
+        series = series.map(repr)
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([str(series.dtype), *params], default=str).encode())
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """LRU cache of rendered PNGs (plus the response headers that go with them),
+    held in memory up to `max_bytes` and optionally spilled to `disk_dir`."""
+
+    def __init__(self, max_bytes=64 * 1024 ** 2, disk_dir=None, max_disk_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> (png bytes, headers), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Running estimate of the bytes on disk; the directory is only listed when it
+        # passes max_disk_bytes (other processes sharing the directory are picked up then)
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_charts())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, entry)
+        return entry
+
+    def put(self, key, png, headers=None):
+        entry = (png, dict(headers or {}))
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "charts": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _store(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._entries[key] = entry
+        self._bytes += len(entry[0])
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (png, _) = self._entries.popitem(last=False)
+            self._bytes -= len(png)
+
+    def _paths(self, key):
+        return os.path.join(self.disk_dir, f"{key}.png"), os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        png_path, headers_path = self._paths(key)
+        try:
+            with open(png_path, 'rb') as f:
+                png = f.read()
+            with open(headers_path) as f:
+                headers = json.load(f)
+            os.utime(png_path)  # mtime doubles as the disk LRU clock
+        except (OSError, ValueError):
+            return None
+        return png, headers
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        png, headers = entry
+        png_path, headers_path = self._paths(key)
+        try:
+            # Headers first: a reader that finds the PNG always finds its headers too
+            _write_atomic(headers_path, json.dumps(headers).encode())
+            _write_atomic(png_path, png)
+        except OSError as e:
+            print(f"Chart cache: could not write {png_path}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(png)
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_charts(self):
+        charts = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.png'):
+                path = os.path.join(self.disk_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # evicted by another process meanwhile
+                charts.append((stat.st_mtime, stat.st_size, path))
+        return charts
+
+    def _evict_disk(self):
+        charts = self._disk_charts()
+        total = sum(size for _, size, _ in charts)
+        for _, size, path in sorted(charts):
+            if total <= self.max_disk_bytes:
+                break
+            for stale in (path, path[:-len('.png')] + '.json'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+
+def _write_atomic(path, data):
+    # Write next to the target and rename over it, so readers (in this process or in
+    # another worker sharing the directory) never see a partly written file
+    temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
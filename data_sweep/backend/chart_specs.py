@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Chart aggregation shared by the PNG renderer (rendering.py) and the JSON
+# chart-spec mode, which sends these aggregates to the client to draw itself.
+
+# Columns with more rows than this are drawn in level-of-detail mode
+LOD_THRESHOLD = int(os.environ.get('DATASWEEP_LOD_THRESHOLD', 50_000))
+# Roughly one bucket per horizontal pixel at the figure sizes used here
+LOD_BUCKETS = 1000
+HISTOGRAM_BINS = 20
+
+
+def choose_xscale(df, column):
+    # Count the number of data points
+    num_points = df[column].count()
+    data_range = df[column].max() - df[column].min()
+
+    # Check if the data contains negative or zero values
+    has_negatives = (df[column] < 0).any()
+    has_zeros = (df[column] == 0).any()
+
+    # Decide on the scale based on dataset size and properties
+    if has_negatives:
+        # Use 'symlog' if there are negative values
+        return 'symlog'
+    elif has_zeros:
+        # Avoid 'log' if there are zeros
+        return 'symlog' if num_points > 500 else 'linear'
+    else:
+        # Use 'log' if the data spans several orders of magnitude and no zeros/negatives
+        if data_range > 1000 and num_points > 100:
+            return 'log'
+        # For small data ranges or small dataset sizes, use 'linear'
+        return 'linear' if num_points < 100 else 'log'
+
+def _scale_positions(values, scale):
+    # Where values land on the x axis, so buckets are evenly sized in pixels
+    if scale == 'log':
+        return np.log10(np.where(values > 0, values, np.nan))
+    if scale == 'symlog':
+        return np.sign(values) * np.log10(1 + np.abs(values))
+    return values
+
+def bucket_min_max(values, scale, buckets=LOD_BUCKETS):
+    # Reduce a column to the min and max value of every occupied x bucket,
+    # returning those points and the number of rows each one stands for
+    values = np.asarray(values, dtype=float)
+    positions = _scale_positions(values, scale)
+    keep = np.isfinite(positions)
+    values, positions = values[keep], positions[keep]
+    if not len(values):
+        return values, np.array([], dtype=int)
+
+    low, high = positions.min(), positions.max()
+    if high > low:
+        bucket = np.minimum(((positions - low) / (high - low) * buckets).astype(int), buckets - 1)
+    else:
+        bucket = np.zeros(len(values), dtype=int)
+
+    order = np.lexsort((values, bucket))  # by bucket, then by value
+    sorted_buckets, sorted_values = bucket[order], values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], len(sorted_values)] - 1
+    counts = ends - starts + 1
+    return np.concatenate([sorted_values[starts], sorted_values[ends]]), np.concatenate([counts, counts])
+
+def index_min_max(dates, buckets=LOD_BUCKETS):
+    # Reduce a date series plotted against row index to the earliest and latest
+    # date in each index bucket, keeping the line's envelope at pixel resolution
+    valid = ~np.asarray(dates.isna())
+    positions = np.flatnonzero(valid)
+    values = np.asarray(dates.asi8)[valid]
+    bucket = positions * buckets // max(len(dates), 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(values)] - 1
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    x = np.column_stack([mins, maxs]).ravel()
+    y = np.column_stack([positions[starts], positions[ends]]).ravel()
+    return pd.to_datetime(x), y
+
+def _iso_dates(dates):
+    return [None if pd.isna(value) else value.isoformat() for value in dates]
+
+def chart_spec(column_name, column_data, classification, lod_threshold=None):
+    # Same charts as rendering.generate_chart, as data instead of pixels
+    lod_threshold = LOD_THRESHOLD if lod_threshold is None else lod_threshold
+    spec = {"column": column_name}
+
+    if classification[0] == 1:  # numerical: histogram
+        values = np.array(
+            [float(i) for i in column_data if isinstance(i, (int, float)) and i is not None],
+            dtype=float,
+        )
+        values = values[np.isfinite(values)]
+        counts, edges = np.histogram(values, bins=HISTOGRAM_BINS) if len(values) else (np.array([]), np.array([]))
+        spec.update({
+            "type": "histogram",
+            "bin_edges": edges.tolist(),
+            "counts": counts.astype(int).tolist(),
+            "scale": choose_xscale(pd.DataFrame({"value": values}), "value") if len(values) else "linear",
+        })
+
+    elif classification[1] == 1:  # categorical: pie of value counts
+        category_counts = pd.Series(column_data[1:]).value_counts()
+        spec.update({
+            "type": "pie",
+            "labels": [str(label) for label in category_counts.index],
+            "counts": category_counts.astype(int).tolist(),
+        })
+
+    elif classification[2] == 1:  # non-categorical: non-empty vs missing bar
+        non_empty = sum(1 for val in column_data if val != '' and val is not None)
+        spec.update({
+            "type": "bar",
+            "labels": ["Non-Empty", "Missing"],
+            "counts": [non_empty, len(column_data) - non_empty],
+        })
+
+    elif classification[3] == 1:  # date: date against row index
+        dates = pd.to_datetime(column_data, errors='coerce')
+        spec["type"] = "date_series"
+        if dates.isnull().all():
+            spec.update({"dates": [], "positions": []})
+        elif len(dates) > lod_threshold:
+            lod_dates, lod_positions = index_min_max(dates)
+            spec.update({"dates": _iso_dates(lod_dates), "positions": lod_positions.tolist(), "aggregated": True})
+        else:
+            spec.update({"dates": _iso_dates(dates), "positions": list(range(len(dates))), "aggregated": False})
+
+    return spec
+
+def outliers_spec(df, column, outlier_mask, scale, thresholds=None):
+    # Boxen/outlier chart as data: quartiles, every outlier, and the normal
+    # points reduced to one min/max pair per pixel bucket
+    values = df[column].to_numpy(dtype=float)
+    normal = values[~outlier_mask]
+    points, counts = bucket_min_max(normal, scale)
+    quartiles = np.nanpercentile(values, [0, 25, 50, 75, 100]).tolist() if len(values) else []
+    return {
+        "type": "boxen",
+        "column": column,
+        "scale": scale,
+        "total": int(len(values)),
+        "quartiles": quartiles,
+        "thresholds": list(thresholds) if thresholds is not None else None,
+        "outliers_count": int(outlier_mask.sum()),
+        "outlier_indices": np.flatnonzero(outlier_mask).tolist(),
+        "outlier_values": values[outlier_mask].tolist(),
+        "normal_points": points.tolist(),
+        "normal_counts": counts.astype(int).tolist(),
+    }
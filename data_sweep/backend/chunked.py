@@ -0,0 +1,303 @@
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from dedupe import ChunkedDedupe
+from jobs import report_progress
+from operations import OPERATIONS, OperationError
+from sketches import KLLSketch, Moments
+
+# Out-of-core execution of column-wise pipeline steps on CSV files that do not fit
+# in memory. The file is streamed from disk in chunks of `chunk_size` rows and the
+# result is written chunk by chunk, so memory stays bounded by the chunk size plus
+# the statistics below.
+#
+# Row-local steps run per chunk with the same code as the in-memory pipeline. Steps
+# that need whole-column statistics (means, modes, min/max, IQR thresholds) get an
+# extra pass over the file first, with the earlier steps applied, to collect them:
+#   mean, std, min, max     exact (streaming moments)
+#   mode                    exact (value counts merged across chunks)
+#   median, IQR quartiles   KLL sketch, rank error within ~1.3% (see sketches.py)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+ROW_LOCAL_OPERATIONS = {
+    'drop_columns', 'apply_letter_casing', 'map_categorical_values',
+    'reformat_date', 'delete_invalid_dates', 'reformat_column',
+}
+
+
+def read_chunks(path, chunk_size):
+    # Raw text cells, so every chunk has the same dtypes whatever its contents
+    return pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+def numeric_values(chunk, column):
+    # float64 in every chunk: to_numeric alone gives int64 to chunks without blanks or
+    # decimals, and one output column would mix "4" and "6.0" (the in-memory pipeline
+    # converts the whole column, so it is float as soon as any value is)
+    if column not in chunk.columns:
+        raise OperationError("Column not found")
+    return pd.to_numeric(chunk[column], errors='coerce').astype('float64')
+
+
+class ChunkStep:
+    """A pipeline step applied chunk by chunk. Steps that need column statistics
+    observe() every chunk in a pass of their own before apply() runs."""
+
+    needs_pass = False
+
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+
+    def observe(self, chunk):
+        pass
+
+    def finish(self):
+        pass
+
+    def reset(self):
+        # Called before every pass over the file
+        pass
+
+    def apply(self, chunk):
+        return OPERATIONS[self.name](chunk, self.params)
+
+
+class DedupeStep(ChunkStep):
+    # dedupe across chunks: row hashes seen so far are kept between chunks
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.dedupe = ChunkedDedupe(params.get('columns'))
+
+    def reset(self):
+        self.dedupe.reset()
+
+    def apply(self, chunk):
+        try:
+            return self.dedupe.filter(chunk).copy()
+        except KeyError as e:
+            raise OperationError(str(e.args[0]))
+
+
+class NumericFillStep(ChunkStep):
+    # numerical_missing_values, with the statistics merged over all chunks
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.column = params.get('column')
+        self.action = params.get('action')
+        if not self.column or not self.action:
+            raise OperationError("Missing required fields")
+        if self.action not in ("Fill/Replace with Mean", "Fill/Replace with Median", "Fill/Replace with Mode",
+                               "Fill/Replace with Custom Value", "Remove Rows", "Leave Blank"):
+            raise OperationError("Invalid action")
+        self.needs_pass = self.action in ("Fill/Replace with Mean", "Fill/Replace with Median", "Fill/Replace with Mode")
+        self.moments = Moments()
+        self.quantiles = KLLSketch()
+        self.counts = Counter()
+        self.fill = None
+        if self.action == "Fill/Replace with Custom Value":
+            try:
+                self.fill = float(params.get('fillValue'))
+            except (TypeError, ValueError):
+                raise OperationError("Custom value must be a numeric value")
+
+    def observe(self, chunk):
+        values = numeric_values(chunk, self.column).dropna().to_numpy()
+        self.moments.update(values)
+        self.quantiles.update(values)
+        # Counter keeps first-seen order, so ties go to the earliest value like statistics.mode
+        codes, uniques = pd.factorize(values)
+        for value, count in zip(uniques, np.bincount(codes, minlength=len(uniques))):
+            self.counts[value] += int(count)
+
+    def finish(self):
+        if self.action == "Fill/Replace with Mean":
+            self.fill = self.moments.mean if self.moments.count else np.nan
+        elif self.action == "Fill/Replace with Median":
+            self.fill = self.quantiles.quantile(0.5)
+        elif self.action == "Fill/Replace with Mode" and self.counts:
+            self.fill = max(self.counts, key=self.counts.get)
+
+    def apply(self, chunk):
+        chunk[self.column] = numeric_values(chunk, self.column)
+        if self.action == "Remove Rows":
+            return chunk.dropna(subset=[self.column]).copy()
+        if self.fill is not None:
+            chunk[self.column] = chunk[self.column].fillna(self.fill)
+        return chunk
+
+
+class TextModeFillStep(ChunkStep):
+    # non_categorical_missing_values "Fill with Mode": counts merged over all chunks
+    needs_pass = True
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.column = params.get('column')
+        self.counts = Counter()
+        self.fill = ""
+
+    def observe(self, chunk):
+        if self.column not in chunk.columns:
+            raise OperationError("Column not found")
+        self.counts.update(chunk[self.column].value_counts().to_dict())
+
+    def finish(self):
+        if self.counts:
+            # Series.mode() sorts the tied values, so the smallest one wins
+            top = max(self.counts.values())
+            self.fill = min(value for value, count in self.counts.items() if count == top)
+
+    def apply(self, chunk):
+        chunk[self.column] = chunk[self.column].replace('', self.fill)
+        return chunk
+
+
+class ScaleStep(ChunkStep):
+    # scale_features with min/max/mean/std from a first pass
+    needs_pass = True
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        methods = params.get('scaling_methods') or {}
+        self.methods = {
+            col: methods.get(col, 'None') for col in params.get('numerical_columns') or []
+            if methods.get(col) in ('Normalization', 'Standardization')
+        }
+        self.moments = {col: Moments() for col in self.methods}
+
+    def observe(self, chunk):
+        for col, moments in self.moments.items():
+            if col in chunk.columns:
+                moments.update(numeric_values(chunk, col).to_numpy())
+
+    def apply(self, chunk):
+        for col, method in self.methods.items():
+            if col not in chunk.columns:
+                continue
+            values = numeric_values(chunk, col)
+            moments = self.moments[col]
+            if method == 'Normalization':
+                chunk[col] = (values - moments.min) / (moments.max - moments.min)
+            else:
+                chunk[col] = (values - moments.mean) / moments.std()
+        return chunk
+
+
+class OutlierStep(ChunkStep):
+    # get_cleaned_file "Resolve Outliers": one pass of the method with IQR thresholds from a sketch
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.column = params.get('column_name')
+        self.method = params.get('method')
+        self.needs_pass = params.get('task') == "Resolve Outliers"
+        self.moments = Moments()
+        self.quantiles = KLLSketch()
+        self.limits = None
+
+    def observe(self, chunk):
+        values = numeric_values(chunk, self.column).to_numpy()
+        self.moments.update(values)
+        self.quantiles.update(values)
+
+    def finish(self):
+        q1, q3 = self.quantiles.quantile(0.25), self.quantiles.quantile(0.75)
+        iqr = q3 - q1
+        self.limits = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+
+    def apply(self, chunk):
+        if not self.needs_pass:
+            return chunk
+        lower_limit, upper_limit = self.limits
+        values = numeric_values(chunk, self.column)
+        outside = (values > upper_limit) | (values < lower_limit)
+        if self.method == "Remove":
+            return chunk[(values < upper_limit) & (values > lower_limit)].copy()
+        if self.method == "Cap and Floor":
+            chunk[self.column] = values.clip(lower_limit, upper_limit)
+        elif self.method == "Replace with Mean":
+            chunk[self.column] = values.mask(outside, self.moments.mean)
+        elif self.method == "Replace with Median":
+            chunk[self.column] = values.mask(outside, self.quantiles.quantile(0.5))
+        return chunk
+
+
+def chunk_step(step):
+    name = step.get('operation')
+    params = step.get('params', {})
+    if name == 'numerical_missing_values':
+        return NumericFillStep(name, params)
+    if name == 'non_categorical_missing_values' and params.get('action') == "Fill with Mode":
+        return TextModeFillStep(name, params)
+    if name == 'non_categorical_missing_values':
+        return ChunkStep(name, params)
+    if name == 'scale_features':
+        return ScaleStep(name, params)
+    if name == 'dedupe':
+        return DedupeStep(name, params)
+    if name == 'get_cleaned_file':
+        return OutlierStep(name, params)
+    if name in ROW_LOCAL_OPERATIONS:
+        return ChunkStep(name, params)
+    raise OperationError(f"'{name}' cannot run in chunked mode")
+
+
+def _apply_steps(chunk, steps):
+    # Steps that drop rows return copies, so the steps after them can assign columns
+    for step in steps:
+        chunk = step.apply(chunk)
+    return chunk
+
+
+def run_chunked(input_path, output_path, steps, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run pipeline `steps` over the CSV at `input_path`, writing the result as CSV to
+    `output_path`; returns a summary of the passes made."""
+    prepared = []
+    passes = 0
+    started = time.perf_counter()
+    for position, step in enumerate(steps):
+        try:
+            current = chunk_step(step)
+            if current.needs_pass:
+                # Statistics are taken on the data as the earlier steps leave it
+                for earlier in prepared:
+                    earlier.reset()
+                for index, chunk in enumerate(read_chunks(input_path, chunk_size)):
+                    report_progress(index, message=f"Statistics pass {passes + 1}, chunk {index + 1}")
+                    current.observe(_apply_steps(chunk, prepared))
+                current.finish()
+                passes += 1
+        except OperationError as e:
+            raise OperationError(f"Step {position} ({step.get('operation')}): {e}")
+        prepared.append(current)
+
+    # Write to a temporary file first so a failed run never leaves a partial output
+    temporary_path = output_path + '.part'
+    rows_in = rows_out = 0
+    for step in prepared:
+        step.reset()
+    try:
+        with open(temporary_path, 'w', newline='') as f:
+            for index, chunk in enumerate(read_chunks(input_path, chunk_size)):
+                report_progress(index, message=f"Writing chunk {index + 1} ({rows_in} rows so far)")
+                rows_in += len(chunk)
+                chunk = _apply_steps(chunk, prepared)
+                rows_out += len(chunk)
+                chunk.to_csv(f, header=index == 0, index=False)
+        os.replace(temporary_path, output_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    return {
+        "output_path": output_path,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "passes": passes + 1,
+        "seconds": time.perf_counter() - started,
+    }
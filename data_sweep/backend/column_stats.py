@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from typed_columns import numeric_column
+from sketches import sketch_column
+
+
+def _first_mode(values):
+    # Most common value, ties going to the one seen first (like statistics.mode)
+    codes, _ = pd.factorize(values, use_na_sentinel=False)
+    # Codes follow first appearance; take each group's first original value (keeps None vs NaN)
+    _, first = np.unique(codes, return_index=True)
+    uniques = values[first]
+    counts = np.bincount(codes, minlength=len(uniques))
+    return uniques[int(np.argmax(counts))], uniques, counts
+
+
+def column_statistics(values, classification, approximate=False, cache=None):
+    """The /calculate-statistics payload for one column, computed with vectorized
+    code; returns (payload, status). With `approximate` the numeric median comes
+    from a quantile sketch (see sketches.py for the error bound)."""
+    values = np.asarray(values, dtype=object)
+
+    if classification[2] == 1:  # non-categorical
+        empty = (values == '') | np.equal(values, None)
+        return {
+            "non_empty_count": int((~empty).sum()),
+            "missing_count": int(empty.sum()),
+        }, 200
+
+    if classification[3] == 1:  # date
+        # No statistics to calculate for date type
+        return {"message": "No statistics available for date type."}, 200
+
+    if classification[0] == 1:  # numerical
+        # Same values float() accepts; invalid or missing values are skipped
+        numbers, valid = numeric_column(values, cache)
+        numbers = numbers[valid]
+        if len(numbers) == 0:
+            return {"error": "No valid numeric data found in column"}, 400
+
+        mode, _, _ = _first_mode(numbers)
+        payload = {
+            "mean": float(np.mean(numbers)),
+            "median": sketch_column(numbers).quantile(0.5) if approximate else float(np.median(numbers)),
+            "mode": float(mode),
+        }
+        if approximate:
+            payload["approximate"] = True
+        return payload, 200
+
+    if classification[1] == 1:  # categorical
+        # For categorical data, the mode and the count of each unique value
+        if len(values) == 0:
+            return {"mode": None, "value_counts": {}}, 200
+        mode, uniques, counts = _first_mode(values)
+        return {
+            "mode": mode,
+            "value_counts": {value: int(count) for value, count in zip(uniques, counts)},
+        }, 200
+
+    # Default return if no matching classification
+    return {"error": "Invalid column classification"}, 200
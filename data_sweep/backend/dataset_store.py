@@ -0,0 +1,292 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dedupe import row_index
+from versions import VersionHistory
+
+
+class DatasetNotFound(KeyError):
+    def __init__(self, dataset_id):
+        super().__init__(dataset_id)
+        self.dataset_id = dataset_id
+
+    def __str__(self):
+        return f"Dataset '{self.dataset_id}' not found or expired"
+
+
+def table_to_frame(table):
+    # Keep the raw cell values (object dtype) so a stored table round-trips exactly
+    return pd.DataFrame(table[1:], columns=table[0], dtype=object)
+
+
+def _is_compact_dtype(dtype):
+    return isinstance(dtype, pd.CategoricalDtype) or (dtype.kind in 'iuf' and dtype.itemsize < 8)
+
+
+def frame_to_table(df):
+    if any(_is_compact_dtype(dtype) for dtype in df.dtypes):
+        # Compact columns (see compact_frame) are converted one by one, so a downcast int
+        # column next to a float32 one is not upcast to float by df.values
+        df = df.astype(object)
+    return [df.columns.tolist()] + df.values.tolist()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+# Share of distinct values below which an all-string column is stored as categorical
+CATEGORICAL_MAX_RATIO = 0.5
+
+
+def _compact_column(series, classification):
+    # Only conversions that give back exactly the same Python values are used, so
+    # frame_to_table (and every route reading the dataset) sees the original table
+    values = series.to_numpy(dtype=object)
+    if len(values) == 0:
+        return series
+    types = set(pd.unique(_type_of(values)))
+
+    if classification[0] == 1 and types == {int}:
+        return pd.to_numeric(series, downcast='integer')
+    if classification[0] == 1 and types == {float}:
+        numbers = series.astype(np.float64)
+        narrow = numbers.astype(np.float32)
+        # float32 only when it round-trips every value (NaN included)
+        if np.array_equal(narrow.to_numpy().astype(np.float64), numbers.to_numpy(), equal_nan=True):
+            return narrow
+        return numbers
+
+    # Labels, free text and dates: dictionary-encode repetitive all-string columns.
+    # Dates stay as their original strings (a datetime64 column cannot give back the
+    # client's text); their parsed form comes from the typed-column cache instead.
+    if types == {str} and series.nunique() <= CATEGORICAL_MAX_RATIO * len(values):
+        return series.astype('category')
+    return series
+
+
+def compact_frame(frame, classifications):
+    """Store-ready copy of an object-dtype frame with dtypes picked from the client's
+    classifications, plus the bytes per column before and after."""
+    compact = frame.copy()
+    report = {}
+    for i, name in enumerate(frame.columns):
+        before = int(frame.iloc[:, i].memory_usage(deep=True, index=False))
+        if i < len(classifications):
+            compact.isetitem(i, _compact_column(frame.iloc[:, i], classifications[i]))
+        column = compact.iloc[:, i]
+        report[str(name)] = {
+            "dtype": str(column.dtype),
+            "bytes_before": before,
+            "bytes_after": int(column.memory_usage(deep=True, index=False)),
+        }
+    return compact, report
+
+
+class _Entry:
+    __slots__ = ('history', 'nbytes', 'last_access')
+
+    def __init__(self, history):
+        self.history = history
+        self.nbytes = history.nbytes
+        self.last_access = time.monotonic()
+
+
+class DatasetStore:
+    """Server-side datasets keyed by id, evicted LRU-first once the count or byte
+    budget is exceeded, and dropped after sitting idle for `idle_seconds`.
+
+    Each dataset keeps its version history (see versions.py): replace() commits a
+    new version, and undo/redo/checkout move between them. A dataset's history is
+    capped at `history_bytes`, spilling old versions to `spill_dir` when set."""
+
+    def __init__(self, max_datasets=64, max_bytes=1024 ** 3, idle_seconds=30 * 60,
+                 history_bytes=256 * 1024 ** 2, spill_dir=None):
+        self.max_datasets = max_datasets
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.history_bytes = history_bytes
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._entries = OrderedDict()  # dataset_id -> _Entry, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def put(self, frame, dataset_id=None):
+        dataset_id = dataset_id or uuid.uuid4().hex
+        history = VersionHistory(frame, max_bytes=self.history_bytes, spill_dir=self.spill_dir)
+        with self._lock:
+            old = self._entries.pop(dataset_id, None)
+            if old is not None:
+                self._total_bytes -= old.nbytes
+                old.history.close()
+            self._entries[dataset_id] = _Entry(history)
+            self._total_bytes += history.nbytes
+            self._expire_idle()
+            self._evict(keep=dataset_id)
+        return dataset_id
+
+    def get(self, dataset_id):
+        with self._lock:
+            return self._touch(dataset_id).history.frame()
+
+    def replace(self, dataset_id, frame, operation=None, base_version=None, delta_from=None):
+        """Commit `frame` as the dataset's new version; HistoryError when `base_version`
+        (the version the frame was computed from) is no longer current. Returns state()
+        of the new version, taken under the same lock as the commit."""
+        with self._lock:
+            history = self._touch(dataset_id).history
+            history.commit(frame, operation, base_version)
+            self._resize(dataset_id)
+            return self.state(dataset_id, delta_from)
+
+    def state(self, dataset_id, delta_from=None):
+        # (info, delta, frame) of the current version, read under one lock. With `delta_from`,
+        # the delta from that version, or the full frame when there is none; else both None
+        with self._lock:
+            history = self._touch(dataset_id).history
+            info = self._info(dataset_id, history)
+            if not delta_from:
+                return info, None, None
+            delta = history.delta(delta_from)
+            return info, delta, history.frame() if delta is None else None
+
+    def undo(self, dataset_id):
+        with self._lock:
+            self._touch(dataset_id).history.undo()
+
+    def redo(self, dataset_id):
+        with self._lock:
+            self._touch(dataset_id).history.redo()
+
+    def checkout(self, dataset_id, version_id):
+        with self._lock:
+            self._touch(dataset_id).history.checkout(version_id)
+
+    def delta(self, dataset_id, base_version_id):
+        with self._lock:
+            return self._touch(dataset_id).history.delta(base_version_id)
+
+    def column_cache(self, dataset_id, position):
+        # Per-column cache dict of the current version (see versions._Block.cache)
+        with self._lock:
+            return self._touch(dataset_id).history.column_cache(position)
+
+    def column(self, dataset_id, position):
+        # One column's values (object dtype) with its per-column cache, read under one
+        # lock so whatever is cached there describes exactly these values
+        with self._lock:
+            history = self._touch(dataset_id).history
+            return history.frame().iloc[:, position].to_numpy(dtype=object), history.column_cache(position)
+
+    def snapshot(self, dataset_id):
+        # Current frame with its per-column caches and version id, read under one lock so
+        # all belong to the same version
+        with self._lock:
+            history = self._touch(dataset_id).history
+            return history.frame(), self.column_caches(dataset_id), history.current
+
+    def column_caches(self, dataset_id):
+        with self._lock:
+            history = self._touch(dataset_id).history
+            return [history.column_cache(i) for i in range(len(history.versions[history.current].blocks))]
+
+    def row_index(self, dataset_id, columns=None):
+        return self.frame_and_row_index(dataset_id, columns)[1]
+
+    def frame_and_row_index(self, dataset_id, columns=None):
+        # Current frame with its duplicate row index (built once per version and column subset)
+        # and version id; read under one lock so the index always has the frame's rows
+        with self._lock:
+            history = self._touch(dataset_id).history
+            cache = history.version_cache()
+            key = ('row_index', tuple(columns) if columns else None)
+            if key not in cache:
+                cache[key] = row_index(history.frame(), columns, self.column_caches(dataset_id))
+            return history.frame(), cache[key], history.current
+
+    def versions(self, dataset_id):
+        with self._lock:
+            return self._touch(dataset_id).history.describe()
+
+    def delete(self, dataset_id):
+        with self._lock:
+            entry = self._entries.pop(dataset_id, None)
+            if entry is None:
+                raise DatasetNotFound(dataset_id)
+            self._total_bytes -= entry.nbytes
+            entry.history.close()
+
+    def info(self, dataset_id):
+        with self._lock:
+            return self._info(dataset_id, self._touch(dataset_id).history)
+
+    def _info(self, dataset_id, history):
+        version = history.versions[history.current]
+        return {
+            "dataset_id": dataset_id,
+            "version": history.current,
+            "columns": list(version.columns),
+            "rows": len(version.index),
+            "bytes": self._entries[dataset_id].nbytes,
+        }
+
+    def stats(self):
+        with self._lock:
+            self._expire_idle()
+            return {
+                "datasets": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_datasets": self.max_datasets,
+                "max_bytes": self.max_bytes,
+                "idle_seconds": self.idle_seconds,
+            }
+
+    def _touch(self, dataset_id):
+        self._expire_idle()
+        entry = self._entries.get(dataset_id)
+        if entry is None:
+            raise DatasetNotFound(dataset_id)
+        entry.last_access = time.monotonic()
+        self._entries.move_to_end(dataset_id)
+        return entry
+
+    def _resize(self, dataset_id):
+        entry = self._entries[dataset_id]
+        self._total_bytes += entry.history.nbytes - entry.nbytes
+        entry.nbytes = entry.history.nbytes
+        self._evict(keep=dataset_id)
+
+    def _expire_idle(self):
+        if self.idle_seconds is None:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        # Entries are kept in access order, so the idle ones are all at the front
+        while self._entries:
+            dataset_id, entry = next(iter(self._entries.items()))
+            if entry.last_access >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+            entry.history.close()
+
+    def _evict(self, keep):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_datasets or self._total_bytes > self.max_bytes
+        ):
+            dataset_id, entry = next(iter(self._entries.items()))
+            if dataset_id == keep:
+                # The dataset just written is the most recent one; never evict it
+                break
+            self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+            entry.history.close()
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Output formats the client can pick from
+DATE_FORMAT_MAPPINGS = {
+    'mm/dd/yyyy': '%m/%d/%Y',
+    'dd/mm/yyyy': '%d/%m/%Y',
+    'yyyy/mm/dd': '%Y/%m/%d',
+}
+
+# Formats accepted as valid when detecting invalid dates
+DETECTION_DATE_FORMATS = [
+    '%m-%d-%y',   # MM-DD-YY
+    '%d-%m-%y',   # DD-MM-YY
+    '%Y-%m-%d',   # YYYY-MM-DD
+    '%m/%d/%Y',   # MM-DD-YYYY
+    '%d/%m/%Y',   # DD-MM-YYYY
+    '%b %d, %Y',  # Jan 01, 2020 (month abbreviation, comma)
+    '%b. %d, %Y', # Jan. 01, 2020 (month abbreviation, period, comma)
+    '%B %d, %Y',  # February 01, 2004 (full month name, comma)
+]
+
+
+class ParsedDates:
+    """Result of parse_dates: one entry per input value, stored as codes into the
+    column's unique values so formatting is also done once per unique value."""
+
+    def __init__(self, codes, parsed_uniques, valid_uniques):
+        self.codes = codes
+        self.parsed_uniques = parsed_uniques
+        self.valid_uniques = valid_uniques
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _broadcast(self, per_unique, fill):
+        out = np.full(len(self.codes), fill, dtype=object if fill is None else bool)
+        present = self.codes >= 0
+        out[present] = per_unique[self.codes[present]]
+        return out
+
+    @property
+    def valid(self):
+        # Boolean mask: True where the value parsed with one of the formats
+        return self._broadcast(self.valid_uniques, False)
+
+    @property
+    def values(self):
+        # Parsed datetimes, None where the value did not parse
+        return self._broadcast(self.parsed_uniques, None)
+
+    def strftime(self, date_format):
+        # Formatted strings, None where the value did not parse
+        formatted = np.array(
+            [value.strftime(date_format) if value is not None else None for value in self.parsed_uniques],
+            dtype=object,
+        )
+        return self._broadcast(formatted, None)
+
+
+def parse_dates(values, formats):
+    """Parse a column of values against `formats`, in order, keeping the first
+    format that matches (same semantics as looping datetime.strptime).
+
+    Only string values are parsed; anything else is reported as invalid.
+    """
+    formats = list(formats)
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques, dtype=object)
+
+    parsed = np.full(len(uniques), None, dtype=object)
+    valid = np.zeros(len(uniques), dtype=bool)
+    pending = np.flatnonzero([isinstance(value, str) for value in uniques])
+
+    # Bulk-parse the still-unparsed unique values one format at a time
+    for date_format in formats:
+        if not len(pending):
+            break
+        attempt = pd.to_datetime(pd.Index(uniques[pending], dtype=object), format=date_format, errors='coerce')
+        matched = ~np.asarray(attempt.isna())
+        if matched.any():
+            parsed[pending[matched]] = attempt[matched].to_pydatetime()
+            valid[pending[matched]] = True
+            pending = pending[~matched]
+
+    # Whatever pandas rejected (e.g. years outside the Timestamp range) gets the exact strptime check
+    for index in pending:
+        for date_format in formats:
+            try:
+                parsed[index] = datetime.strptime(uniques[index], date_format)
+                valid[index] = True
+                break
+            except ValueError:
+                continue
+
+    return ParsedDates(codes, parsed, valid)
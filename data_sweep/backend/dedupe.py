@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from typed_columns import encoded_column
+
+# Duplicate detection through a row index. Each column is dictionary-encoded (the
+# same encodings the typed-column cache keeps, so NaN equals NaN and 1 equals 1.0, as
+# in drop_duplicates), and the codes of the selected columns are combined column by
+# column into one group id per row. Rows share a group exactly when they are equal in
+# every selected column: nothing is hashed, so two different rows never collide.
+#
+# ChunkedDedupe cannot keep the rows of earlier chunks, so it remembers 64-bit row
+# hashes instead; collisions there are possible but have negligible odds (~n**2 / 2**65).
+
+
+class RowIndex:
+    """Duplicate groups of a table over a set of columns: a group id per row
+    (numbered by first appearance) and the size of each group."""
+
+    def __init__(self, group_ids):
+        self.group_ids = group_ids
+        self.group_sizes = np.bincount(group_ids, minlength=group_ids.max() + 1 if len(group_ids) else 0)
+        # Group ids follow first appearance, so each group's first row is where its id first shows up
+        _, self.first_rows = np.unique(group_ids, return_index=True)
+        first = np.zeros(len(group_ids), dtype=bool)
+        first[self.first_rows] = True
+        self.duplicated = ~first
+
+    def report(self, limit=10):
+        duplicate_groups = np.flatnonzero(self.group_sizes > 1)
+        largest = duplicate_groups[np.argsort(-self.group_sizes[duplicate_groups], kind='stable')][:limit]
+        return {
+            "rows": len(self.group_ids),
+            "unique_rows": len(self.group_sizes),
+            "duplicate_rows": int(self.duplicated.sum()),
+            "duplicate_groups": len(duplicate_groups),
+            "largest_groups": [
+                {"first_row": int(self.first_rows[group]), "count": int(self.group_sizes[group])}
+                for group in largest
+            ],
+        }
+
+
+def _positions(frame, columns):
+    if not columns:
+        return list(range(frame.shape[1]))
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Columns not found: {missing}")
+    return [frame.columns.get_loc(column) for column in columns]
+
+
+def row_groups(frame, columns=None, caches=None):
+    """Group id per row over `columns` (all columns when None), numbered by first
+    appearance. `caches` are the per-column typed-column caches, so stored datasets
+    reuse their encodings."""
+    group_ids = np.zeros(len(frame), dtype=np.int64)
+    for i in _positions(frame, columns):
+        cache = caches[i] if caches is not None else None
+        codes, uniques = encoded_column(frame.iloc[:, i].to_numpy(dtype=object), cache)
+        # Pairs (group so far, code) numbered exactly; both are below the row count,
+        # so the combined value fits in int64 for up to ~3 billion rows
+        group_ids, _ = pd.factorize(group_ids * len(uniques) + codes)
+    return group_ids
+
+
+def row_index(frame, columns=None, caches=None):
+    return RowIndex(row_groups(frame, columns, caches))
+
+
+class ChunkedDedupe:
+    """Drops rows already seen in earlier chunks (or earlier in the same chunk).
+    Memory grows with the number of distinct rows (8 bytes each), not with the table."""
+
+    def __init__(self, columns=None):
+        self.columns = columns or None
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def reset(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def filter(self, chunk):
+        if self.columns:
+            missing = [column for column in self.columns if column not in chunk.columns]
+            if missing:
+                raise KeyError(f"Columns not found: {missing}")
+        subset = chunk[self.columns] if self.columns else chunk
+        hashes = pd.util.hash_pandas_object(subset, index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, self.seen)
+        self.seen = np.union1d(self.seen, hashes[keep])
+        return chunk[keep]
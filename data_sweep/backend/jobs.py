@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobNotFound(KeyError):
+    def __init__(self, job_id):
+        super().__init__(job_id)
+        self.job_id = job_id
+
+    def __str__(self):
+        return f"Job '{self.job_id}' not found"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(BaseException):
+    # BaseException so the routes' broad `except Exception` blocks do not swallow it
+    pass
+
+
+_local = threading.local()
+
+
+def report_progress(done, total=None, message=None):
+    """Progress checkpoint for long-running work. Outside a job this does nothing;
+    inside one it records `done` out of `total` (just the message when the total is
+    unknown) and stops the work if the job was cancelled."""
+    job = getattr(_local, 'job', None)
+    if job is None:
+        return
+    if job.cancel_requested:
+        raise JobCancelled()
+    if total:
+        job.update(progress=min(done / total, 1.0), message=message)
+    else:
+        job.update(message=message)
+
+
+class Job:
+    __slots__ = ('job_id', 'description', 'status', 'progress', 'message', 'result', 'error',
+                 'created', 'started', 'finished', 'cancel_requested', 'future', '_changed')
+
+    def __init__(self, description):
+        self.job_id = uuid.uuid4().hex
+        self.description = description
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self.future = None
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def update(self, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._changed.notify_all()
+
+    def wait_for_change(self, timeout):
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def describe(self):
+        return {
+            "job_id": self.job_id,
+            "description": self.description,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobQueue:
+    """Runs submitted work on `workers` background threads. At most `max_pending`
+    jobs may wait; finished jobs (with their results) are kept until `max_finished`
+    newer ones have finished."""
+
+    def __init__(self, workers=2, max_pending=32, max_finished=100):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()  # job_id -> Job, oldest first
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, description, fn, *args):
+        job = Job(description)
+        with self._lock:
+            pending = sum(1 for queued in self._jobs.values() if queued.status == 'queued')
+            if pending >= self.max_pending:
+                raise JobQueueFull("Too many jobs are waiting, try again shortly")
+            self._jobs[job.job_id] = job
+            self._forget_finished()
+        job.future = self._executor.submit(self._run, job, fn, *args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        job.update(cancel_requested=True)
+        if job.future is not None and job.future.cancel():
+            # Never started
+            job.update(status='cancelled', finished=time.time())
+        return job
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            **{status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed', 'cancelled')},
+        }
+
+    def _run(self, job, fn, *args):
+        if job.cancel_requested:
+            job.update(status='cancelled', finished=time.time())
+            return
+        job.update(status='running', started=time.time())
+        _local.job = job
+        try:
+            result = fn(*args)
+            job.update(status='done', result=result, progress=1.0, finished=time.time())
+        except JobCancelled:
+            job.update(status='cancelled', finished=time.time())
+        except Exception as e:
+            job.update(status='failed', error=str(e), finished=time.time())
+        finally:
+            _local.job = None
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,355 @@
+import statistics
+import time
+from functools import partial
+from statistics import StatisticsError
+
+import numpy as np
+import pandas as pd
+
+from date_engine import DATE_FORMAT_MAPPINGS, parse_dates
+from dedupe import row_index
+from jobs import report_progress
+from outliers import apply_outlier_method, resolve_columns
+
+# Cleaning steps as DataFrame -> DataFrame functions. The routes in app.py call
+# them on the table they receive, and /pipeline chains them on one DataFrame.
+# Each step takes the same parameters as the JSON body of its route.
+
+
+class OperationError(ValueError):
+    pass
+
+
+OPERATIONS = {}
+
+
+def operation(name):
+    def register(fn):
+        OPERATIONS[name] = fn
+        return fn
+    return register
+
+
+def to_title_case(string):
+    return ' '.join([word.capitalize() if len(word) > 1 else word.upper() for word in string.split(' ')])
+
+def to_sentence_case(string):
+    if not string:
+        return string
+    return string[0].upper() + string[1:].lower()
+
+def change_case(value, casing):
+    if not isinstance(value, str):
+        return value
+    if casing == 'UPPERCASE':
+        return value.upper()
+    elif casing == 'lowercase':
+        return value.lower()
+    elif casing == 'Title Case':
+        return to_title_case(value)
+    elif casing == 'Sentence case':
+        return to_sentence_case(value)
+    return value
+
+def category_lookup(mapping, value):
+    # Same result as Series.map(dict): unmapped values become NaN
+    try:
+        return mapping.get(value, np.nan)
+    except TypeError:
+        return np.nan
+
+def map_distinct(series, fn):
+    """series.map(fn), with fn called once per distinct value and the results broadcast
+    back through the factorized codes, so the cost follows the column's cardinality.
+    Where fn returns a value unchanged, the original cells are kept as they were
+    (so 1 and 1.0, which share a code, stay distinct)."""
+    values = series.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [fn(value) for value in uniques]
+    changed = np.array([new is not old for new, old in zip(mapped, uniques)], dtype=bool)
+
+    result = values.copy()
+    present = codes >= 0
+    replace = np.zeros(len(values), dtype=bool)
+    replace[present] = changed[codes[present]]
+    result[replace] = mapped[codes[replace]]
+    # Missing values (None/NaN) have no code; they are few, map them one by one
+    missing = np.flatnonzero(~present)
+    if len(missing):
+        result[missing] = [fn(value) for value in values[missing]]
+    return pd.Series(result, index=series.index, name=series.name).infer_objects()
+
+
+@operation('remove_columns')
+def remove_columns(df, params):
+    columns_to_remove = params.get('columnsToRemove', [])
+    if not columns_to_remove:
+        raise OperationError('No columns specified to remove')
+
+    # Drop duplicates (same rows as drop_duplicates keeps), then remove the specified columns
+    return df[~row_index(df).duplicated].drop(columns=columns_to_remove)
+
+
+@operation('dedupe')
+def dedupe(df, params):
+    # Keep the first row of each duplicate group, comparing only `columns` when given
+    try:
+        index = row_index(df, params.get('columns'))
+    except KeyError as e:
+        raise OperationError(str(e.args[0]))
+    return df[~index.duplicated]
+
+
+@operation('drop_columns')
+def drop_columns(df, params):
+    # Plain column removal, without remove_columns' duplicate-row pass
+    columns = params.get('columns', [])
+    if not columns:
+        raise OperationError('No columns specified to drop')
+    return df.drop(columns=columns)
+
+
+@operation('numerical_missing_values')
+def numerical_missing_values(df, params):
+    column_name = params.get('column')
+    action = params.get('action')
+    fill_value = params.get('fillValue')
+    if not column_name or not action:
+        raise OperationError("Missing required fields")
+
+    df[column_name] = pd.to_numeric(df[column_name], errors='coerce')  # Convert column to numeric, non-numeric to NaN
+
+    # Calculate mean, median, and mode ignoring NaN values
+    mean_value = df[column_name].mean()
+    median_value = df[column_name].median()
+    try:
+        mode_value = statistics.mode(df[column_name].dropna())
+    except StatisticsError:
+        mode_value = None  # Handle case where mode cannot be determined
+
+    # Handle the selected action
+    if action == "Fill/Replace with Mean":
+        df[column_name] = df[column_name].fillna(mean_value)
+    elif action == "Fill/Replace with Median":
+        df[column_name] = df[column_name].fillna(median_value)
+    elif action == "Fill/Replace with Mode" and mode_value is not None:
+        df[column_name] = df[column_name].fillna(mode_value)
+    elif action == "Fill/Replace with Custom Value":
+        try:
+            custom_value = float(fill_value)
+        except ValueError:
+            raise OperationError("Custom value must be a numeric value")
+        df[column_name] = df[column_name].fillna(custom_value)
+    elif action == "Remove Rows":
+        df = df.dropna(subset=[column_name])
+    elif action == "Leave Blank":
+        # Do nothing, leave the values as they are
+        pass
+    else:
+        raise OperationError("Invalid action")
+
+    # Replace NaN with None for JSON serialization
+    return df.where(pd.notnull(df), None)
+
+
+@operation('non_categorical_missing_values')
+def non_categorical_missing_values(df, params):
+    column_name = params.get('column')
+    action = params.get('action')
+    fill_value = params.get('fillValue')
+
+    if column_name not in df.columns:
+        raise OperationError("Column not found")
+
+    if action == "Remove Rows":
+        # Filter out rows where the column contains empty strings or spaces
+        return df[df[column_name].str.strip().ne('')]
+
+    elif action == "Fill with":
+        # Check if fill_value is valid (not None or empty)
+        if fill_value is None or fill_value == "":
+            raise OperationError("Fill value cannot be None or empty")
+
+        # Apply fill operation to the correct column (handle empty strings)
+        if df[column_name].dtype == 'object':  # If the column is of type object (e.g., string)
+            df[column_name] = df[column_name].replace('', fill_value)  # Replace empty strings with fill_value
+            df[column_name] = df[column_name].replace(' ', fill_value)  # Replace spaces with fill_value
+        return df
+
+    elif action == "Fill with Mode":
+        mode_value = df[column_name].mode().iloc[0] if not df[column_name].mode().empty else ""
+        print(f"Mode Value for {column_name}: {mode_value}")
+
+        # Replace empty strings in the column with mode value
+        df[column_name] = df[column_name].replace('', mode_value)
+        return df
+
+    elif action == "Leave Blank":
+        return df
+
+    raise OperationError("Invalid action")
+
+
+@operation('apply_letter_casing')
+def apply_letter_casing(df, params):
+    columns = params['columns']
+    casing_selections = params['casingSelections']
+    # Columns are matched by position, like the client's column list; each distinct
+    # value is re-cased once
+    for i in range(len(columns)):
+        casing = casing_selections[i]
+        if casing not in ('UPPERCASE', 'lowercase', 'Title Case', 'Sentence case'):
+            continue  # nothing to change
+        df.isetitem(i, map_distinct(df.iloc[:, i], partial(change_case, casing=casing)))
+    return df
+
+
+@operation('map_categorical_values')
+def map_categorical_values(df, params):
+    column = params.get('column')
+    category_mapping = dict(zip(params.get('unique_values'), params.get('standard_format')))
+    print(f"Category mapping dictionary created: {category_mapping}")
+
+    # Apply mapping if the column exists in the DataFrame, once per distinct value
+    if column in df.columns:
+        df[column] = map_distinct(df[column], partial(category_lookup, category_mapping))
+    else:
+        print(f"Error: Column '{column}' not found in DataFrame.")
+    return df
+
+
+def _date_column_indices(classifications):
+    # 1 in the fourth slot marks a date column
+    return [index for index, classification in enumerate(classifications) if classification[3] == 1]
+
+def _non_empty_strings(values):
+    return np.array([isinstance(value, str) and bool(value.strip()) for value in values], dtype=bool)
+
+
+@operation('reformat_date')
+def reformat_date(df, params):
+    date_format = params['dateFormats']
+    if date_format not in DATE_FORMAT_MAPPINGS:
+        raise OperationError(f"Unsupported date format: {date_format}")
+    target_format_str = DATE_FORMAT_MAPPINGS[date_format]
+
+    # Parse each date column in bulk and only rewrite the values that parsed
+    for col_index in _date_column_indices(params['classifications']):
+        values = df.iloc[:, col_index].to_numpy(dtype=object)
+        parsed = parse_dates(values, DATE_FORMAT_MAPPINGS.values())
+        if parsed.valid.any():
+            df.isetitem(col_index, np.where(parsed.valid, parsed.strftime(target_format_str), values))
+    return df
+
+
+@operation('delete_invalid_dates')
+def delete_invalid_dates(df, params):
+    date_format = params['dateFormat']
+    if date_format not in DATE_FORMAT_MAPPINGS:
+        raise OperationError(f"Unsupported date format: {date_format}")
+
+    # Try the target format first, then the other supported formats
+    target_format_str = DATE_FORMAT_MAPPINGS[date_format]
+    candidate_formats = [target_format_str] + [fmt for fmt in DATE_FORMAT_MAPPINGS.values() if fmt != target_format_str]
+
+    # A row is dropped when any of its non-empty string date values fails to parse
+    row_valid = np.ones(len(df), dtype=bool)
+    for col_index in _date_column_indices(params['classifications']):
+        values = df.iloc[:, col_index].to_numpy(dtype=object)
+        row_valid &= ~_non_empty_strings(values) | parse_dates(values, candidate_formats).valid
+    print(f"Invalid dates found in {len(df) - int(row_valid.sum())} rows")
+
+    return reformat_date(df[row_valid], {'dateFormats': date_format, 'classifications': params['classifications']})
+
+
+@operation('reformat_column')
+def reformat_column(df, params):
+    date_format = params['dateFormat']
+    column_index = params['columnIndex']
+    if date_format not in DATE_FORMAT_MAPPINGS:
+        raise OperationError(f"Unsupported date format: {date_format}")
+    target_format_str = DATE_FORMAT_MAPPINGS[date_format]
+
+    # Parse the selected column using multiple formats
+    values = df.iloc[:, column_index].to_numpy(dtype=object)
+    checked = _non_empty_strings(values)
+    parsed = parse_dates(values, DATE_FORMAT_MAPPINGS.values())
+
+    # Reformat the dates that parsed and delete rows with invalid dates
+    reformat = checked & parsed.valid
+    if reformat.any():
+        df.isetitem(column_index, np.where(reformat, parsed.strftime(target_format_str), values))
+    return df[~checked | parsed.valid]
+
+
+@operation('scale_features')
+def scale_features(df, params):
+    numerical_columns = params.get('numerical_columns')
+    scaling_methods = params.get('scaling_methods')
+
+    # Apply the scaling method for each numerical column
+    for col in numerical_columns:
+        method = scaling_methods.get(col, 'None')
+        if col not in df.columns or method not in ('Normalization', 'Standardization'):
+            continue
+        # Earlier pipeline steps can leave numbers in object columns (None for missing)
+        values = df[col].infer_objects()
+        if method == 'Normalization':
+            df[col] = (values - values.min()) / (values.max() - values.min())
+        elif method == 'Standardization':
+            df[col] = (values - values.mean()) / values.std()
+    return df
+
+
+@operation('get_cleaned_file')
+def get_cleaned_file(df, params):
+    # One pass of the selected outlier removal method
+    if params.get('task') == "Resolve Outliers":
+        return apply_outlier_method(df.copy(), params.get('column_name'), params.get('method'),
+                                    bool(params.get('approximate', False)))
+    return df.copy()
+
+
+@operation('resolve_outliers_columns')
+def resolve_outliers_columns(df, params):
+    # One vectorized pass of the outlier method over several numeric columns
+    columns = params.get('columns') or []
+    missing = [column for column in columns if column not in df.columns]
+    if not columns or missing:
+        raise OperationError(f"Columns not found: {missing}" if missing else "No columns specified")
+    resolved, _ = resolve_columns(
+        df.copy(), columns, params.get('method'),
+        params.get('threshold_method', 'IQR'), bool(params.get('approximate', False)),
+    )
+    return resolved
+
+
+def run_pipeline(df, steps):
+    """Run `steps` ([{"operation": name, "params": {...}}, ...]) in order on one
+    DataFrame; returns the result and a per-step report."""
+    report = []
+    for position, step in enumerate(steps):
+        name = step.get('operation')
+        if name not in OPERATIONS:
+            raise OperationError(f"Step {position}: unknown operation '{name}'")
+        report_progress(position, len(steps), f"Step {position} ({name})")
+
+        rows_before = len(df)
+        started = time.perf_counter()
+        try:
+            df = OPERATIONS[name](df, step.get('params', {}))
+        except OperationError as e:
+            raise OperationError(f"Step {position} ({name}): {e}")
+        except (KeyError, TypeError, ValueError) as e:
+            # Missing or malformed params, e.g. a casing step without "column"
+            raise OperationError(f"Step {position} ({name}): invalid params ({type(e).__name__}: {e})")
+        report.append({
+            "operation": name,
+            "seconds": time.perf_counter() - started,
+            "rows_before": rows_before,
+            "rows_after": len(df),
+            "columns": len(df.columns),
+        })
+    return df, report
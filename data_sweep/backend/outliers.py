@@ -0,0 +1,250 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.stats import zscore
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+
+from jobs import report_progress
+from sketches import sketch_column
+
+# approximate=True swaps the exact full-column passes (quantiles, np.unique, skew,
+# median) for a mergeable ColumnSketch; see sketches.py for the error bounds.
+
+
+def calculate_iqr_thresholds(series, approximate=False, sketch=None):
+    if approximate:
+        sketch = sketch or sketch_column(series)
+        q1 = sketch.quantile(0.25)
+        q3 = sketch.quantile(0.75)
+    else:
+        q1 = series.quantile(0.25)
+        q3 = series.quantile(0.75)
+    iqr = q3 - q1
+    outlier_threshold_lower = q1 - 1.5 * iqr
+    outlier_threshold_upper = q3 + 1.5 * iqr
+    return outlier_threshold_lower, outlier_threshold_upper
+
+
+def choose_outlier_detection_method(df, column, approximate=False):
+    if approximate:
+        sketch = sketch_column(df[column])
+        skewness = sketch.moments.skew()
+        distinct = sketch.distinct.estimate()
+    else:
+        skewness = df[column].skew()
+        distinct = len(np.unique(df[column]))
+    is_normal = abs(skewness) < 0.5
+    is_high_dimensional = len(df.columns) > 10
+    is_clustered = distinct > 10
+
+    if is_normal:
+        print("Data is normally distributed. Using Z-score for outlier detection.")
+        return 'Z-score'
+    elif not is_normal and not is_high_dimensional:
+        print("Data is skewed. Using IQR for outlier detection.")
+        return 'IQR'
+    elif is_high_dimensional:
+        print("Data is high-dimensional. Using Isolation Forest for outlier detection.")
+        return 'Isolation Forest'
+    elif is_clustered:
+        print("Data has clusters. Using Local Outlier Factor (LOF) for outlier detection.")
+        return 'LOF'
+    else:
+        print("Using default method: IQR.")
+        return 'IQR'
+
+# IsolationForest / LOF train on at most this many (randomly sampled) rows and then
+# score every row; smaller tables are fitted exactly as before
+MODEL_MAX_TRAIN_ROWS = int(os.environ.get('DATASWEEP_MODEL_MAX_TRAIN_ROWS', 100_000))
+# Cores used by the detectors (-1: all)
+MODEL_JOBS = int(os.environ.get('DATASWEEP_MODEL_JOBS', -1))
+# Fitted models and their outlier masks, keyed by the content of the scored columns
+MODEL_CACHE_ENTRIES = 32
+
+_model_cache = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+
+def _features_key(features, method, max_train_rows):
+    # Same data and settings give the same key, so an unchanged dataset version is never refitted
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(features, index=False).to_numpy().tobytes())
+    digest.update(repr((list(features.columns), method, max_train_rows)).encode())
+    return digest.hexdigest()
+
+def _fit_detector(values, method, max_train_rows, n_jobs):
+    sample = None
+    if len(values) > max_train_rows:
+        sample = np.random.default_rng(0).choice(len(values), max_train_rows, replace=False)
+
+    if method == 'Isolation Forest':
+        model = IsolationForest(n_jobs=n_jobs, random_state=0 if sample is not None else None)
+        model.fit(values if sample is None else values[sample])
+        return model, model.predict(values) == -1
+    if sample is None:
+        model = LocalOutlierFactor(n_jobs=n_jobs)
+        return model, model.fit_predict(values) == -1
+    # Subsampled LOF: learn the neighbourhoods from the sample and score only the other
+    # rows against them (predict on training rows counts each as its own neighbour).
+    # The sample's own labels are fit_predict's: its outlier factors below the offset.
+    model = LocalOutlierFactor(novelty=True, n_jobs=n_jobs)
+    model.fit(values[sample])
+    mask = np.zeros(len(values), dtype=bool)
+    mask[sample] = model.negative_outlier_factor_ < model.offset_
+    rest = np.setdiff1d(np.arange(len(values)), sample, assume_unique=True)
+    mask[rest] = model.predict(values[rest]) == -1
+    return model, mask
+
+def model_outlier_mask(df, columns, method, max_train_rows=None, n_jobs=None):
+    """Outlier mask from IsolationForest or LOF. With several columns each row is
+    scored as one point (row-wise detection). Fitted models and masks are cached by
+    the content of the columns."""
+    max_train_rows = max_train_rows or MODEL_MAX_TRAIN_ROWS
+    n_jobs = n_jobs or MODEL_JOBS
+    features = df[columns]
+    key = _features_key(features, method, max_train_rows)
+    with _model_cache_lock:
+        cached = _model_cache.get(key)
+        if cached is not None:
+            _model_cache.move_to_end(key)
+            return cached[1]
+
+    report_progress(0, message=f"Fitting {method} on {len(features)} rows")
+    model, mask = _fit_detector(features.to_numpy(dtype=float), method, max_train_rows, n_jobs)
+    with _model_cache_lock:
+        _model_cache[key] = (model, mask)
+        while len(_model_cache) > MODEL_CACHE_ENTRIES:
+            _model_cache.popitem(last=False)
+    return mask
+
+def detect_outliers(df, column, method, approximate=False, feature_columns=None):
+    # feature_columns: score rows on several columns with the model-based methods
+    if method == 'Z-score':
+        z_scores = zscore(df[column])
+        outliers = df[np.abs(z_scores) > 3]
+    elif method == 'IQR':
+        lower_limit, upper_limit = calculate_iqr_thresholds(df[column], approximate)
+        outliers = df[(df[column] < lower_limit) | (df[column] > upper_limit)]
+    elif method in ('Isolation Forest', 'LOF'):
+        outliers = df[model_outlier_mask(df, feature_columns or [column], method)]
+    return outliers
+
+def resolve_outliers(df, column, method, detection_method, max_iterations=100, tolerance=0.0, approximate=False,
+                     feature_columns=None):
+    # Apply the resolution method until the detector finds no more than `tolerance`
+    # (a fraction of rows) outliers, the step stops changing anything, or the cap is hit.
+    # Only counts are computed here; the caller renders the final result once.
+    resolved = df.copy()
+    max_iterations = max(1, max_iterations)
+    iterations = 0
+    outliers_count = None
+    while iterations < max_iterations:
+        report_progress(iterations, max_iterations, f"Iteration {iterations + 1}, {outliers_count} outliers left")
+        previous_rows = len(resolved)
+        previous_values = resolved[column].copy()
+
+        resolved = apply_outlier_method(resolved, column, method, approximate)
+        iterations += 1
+
+        outliers_count = (
+            len(detect_outliers(resolved, column, detection_method, approximate, feature_columns)) if len(resolved) else 0
+        )
+        if outliers_count <= tolerance * len(resolved):
+            break
+        if len(resolved) == previous_rows and resolved[column].equals(previous_values):
+            break  # Converged: another pass would not change anything
+
+    # Rows removed plus rows whose value in the column was replaced
+    kept_original = df.loc[resolved.index, column]
+    changed = ~((resolved[column] == kept_original) | (resolved[column].isna() & kept_original.isna()))
+    rows_affected = (len(df) - len(resolved)) + int(changed.sum())
+    return resolved, {
+        "iterations": iterations,
+        "rows_affected": rows_affected,
+        "outliers_remaining": outliers_count,
+        "converged": iterations < max_iterations or outliers_count <= tolerance * len(resolved),
+    }
+
+def filter_outliers_by_z_score(df, column, approximate=False):
+    lower_limit, upper_limit = calculate_iqr_thresholds(df[column], approximate)
+    new_df = df.loc[(df[column] < upper_limit) & (df[column] > lower_limit)]
+    return new_df
+
+def cap_and_floor(df, column, approximate=False):
+    lower_limit, upper_limit = calculate_iqr_thresholds(df[column], approximate)
+    df[column] = df[column].clip(lower_limit, upper_limit)
+    return df
+
+def replace_with_mean(df, column, approximate=False):
+    lower_limit, upper_limit = calculate_iqr_thresholds(df[column], approximate)
+    column_mean = df[column].mean()
+    df[column] = df[column].mask((df[column] > upper_limit) | (df[column] < lower_limit), column_mean)
+    return df
+
+def replace_with_median(df, column, approximate=False):
+    if approximate:
+        # One sketch serves both the thresholds and the median
+        sketch = sketch_column(df[column])
+        lower_limit, upper_limit = calculate_iqr_thresholds(df[column], approximate, sketch)
+        column_median = sketch.quantile(0.5)
+    else:
+        lower_limit, upper_limit = calculate_iqr_thresholds(df[column])
+        column_median = df[column].median()
+    df[column] = df[column].mask((df[column] > upper_limit) | (df[column] < lower_limit), column_median)
+    return df
+
+def apply_outlier_method(df, column, method, approximate=False):
+    # One pass of the selected outlier resolution method
+    if method == "Remove":
+        return filter_outliers_by_z_score(df, column, approximate)
+    elif method == "Cap and Floor":
+        return cap_and_floor(df, column, approximate)
+    elif method == "Replace with Mean":
+        return replace_with_mean(df, column, approximate)
+    elif method == "Replace with Median":
+        return replace_with_median(df, column, approximate)
+    return df
+
+def column_thresholds(df, columns, threshold_method='IQR', approximate=False):
+    """Lower and upper outlier limits for several columns at once, as two Series
+    indexed by column: IQR fences (1.5 * IQR) or Z-score limits (3 standard deviations)."""
+    values = df[columns]
+    if threshold_method == 'Z-score':
+        means = values.mean()
+        stds = values.std(ddof=0)  # same spread as scipy's zscore
+        return means - 3 * stds, means + 3 * stds
+    if approximate:
+        sketches = {column: sketch_column(values[column]) for column in columns}
+        q1 = pd.Series({column: sketch.quantile(0.25) for column, sketch in sketches.items()})
+        q3 = pd.Series({column: sketch.quantile(0.75) for column, sketch in sketches.items()})
+    else:
+        quartiles = values.quantile([0.25, 0.75])
+        q1, q3 = quartiles.loc[0.25], quartiles.loc[0.75]
+    iqr = q3 - q1
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+def resolve_columns(df, columns, method, threshold_method='IQR', approximate=False):
+    """One pass of `method` over several numeric columns with vectorized masks.
+    "Remove" drops every row that is an outlier in any of the columns in a single
+    filter; the other methods replace values column-wise. Returns the result and
+    per-column counts."""
+    lower, upper = column_thresholds(df, columns, threshold_method, approximate)
+    values = df[columns]
+    outside = values.lt(lower, axis=1) | values.gt(upper, axis=1)
+    counts = {column: int(count) for column, count in outside.sum().items()}
+
+    if method == "Remove":
+        inside = values.gt(lower, axis=1) & values.lt(upper, axis=1)
+        return df[inside.all(axis=1)], counts
+    if method == "Cap and Floor":
+        df[columns] = values.clip(lower=lower, upper=upper, axis=1)
+    elif method == "Replace with Mean":
+        df[columns] = values.mask(outside, values.mean(), axis=1)
+    elif method == "Replace with Median":
+        df[columns] = values.mask(outside, values.median(), axis=1)
+    return df, counts
@@ -0,0 +1,285 @@
+import time
+from functools import partial
+
+from jobs import report_progress
+from operations import OPERATIONS, OperationError, category_lookup, change_case, map_distinct
+
+# Lazy pipeline plans. Steps are recorded first; optimize() then rewrites the plan:
+#   1. steps that only touch columns a later drop_columns step removes are pruned
+#      (per column for casing/category maps, whole step otherwise),
+#   2. row-dropping filters move ahead of row-local column transforms they do not
+#      depend on, so the transforms run on fewer rows,
+#   3. consecutive per-cell maps (casing, category mapping) are fused into one
+#      pass per column.
+# Positional parameters (casing, date steps) are resolved to column names when the
+# step is recorded, and filters never move across a step that drops columns.
+
+ALL_COLUMNS = None  # reads/writes marker for steps that touch the whole table
+
+
+class PlanStep:
+    def __init__(self, operation, params, reads=ALL_COLUMNS, writes=ALL_COLUMNS, row_local=False,
+                 drops_rows=False, dropped_columns=(), cell_fns=None):
+        self.operation = operation
+        self.params = params
+        self.reads = reads
+        self.writes = writes
+        self.row_local = row_local  # each output row depends only on the same input row
+        self.drops_rows = drops_rows
+        self.dropped_columns = list(dropped_columns)
+        self.cell_fns = cell_fns  # {column: [fn, ...]} for per-cell maps, else None
+        self.sources = []  # positions of the recorded steps this one came from
+        self.notes = []
+
+    def describe(self):
+        return {
+            "operation": self.operation,
+            "sources": self.sources,
+            "columns": sorted(self.cell_fns) if self.cell_fns is not None else None,
+            "reads": "all" if self.reads is ALL_COLUMNS else sorted(self.reads),
+            "writes": "all" if self.writes is ALL_COLUMNS else sorted(self.writes),
+            "drops_rows": self.drops_rows,
+            "dropped_columns": self.dropped_columns,
+            "notes": self.notes,
+        }
+
+
+def _overlaps(a, b):
+    if a is ALL_COLUMNS or b is ALL_COLUMNS:
+        return True
+    return bool(set(a) & set(b))
+
+def _date_columns(params, columns):
+    classifications = params.get('classifications')
+    if not isinstance(classifications, list):
+        raise OperationError("Missing classifications")
+    return [columns[i] for i, classification in enumerate(classifications)
+            if i < len(columns) and len(classification) > 3 and classification[3] == 1]
+
+
+def describe_step(operation, params, columns):
+    """Plan metadata for one recorded step, given the columns present at that point."""
+    if operation == 'drop_columns':
+        return PlanStep(operation, params, reads=set(), writes=set(), row_local=True,
+                        dropped_columns=params.get('columns', []))
+
+    if operation == 'remove_columns':
+        # Duplicate rows are judged on every column before the drop
+        return PlanStep(operation, params, drops_rows=True, dropped_columns=params.get('columnsToRemove', []))
+
+    if operation == 'dedupe':
+        # Depends only on the compared columns, so it can move ahead of maps on other columns
+        subset = params.get('columns')
+        return PlanStep(operation, params, reads=set(subset) if subset else ALL_COLUMNS, writes=set(),
+                        row_local=True, drops_rows=True)
+
+    if operation == 'apply_letter_casing':
+        selected, casings = params.get('columns'), params.get('casingSelections')
+        if not isinstance(selected, list) or not isinstance(casings, list):
+            raise OperationError("Missing columns or casingSelections")
+        cell_fns = {}
+        for i, casing in enumerate(casings[:len(selected)]):
+            if casing in ('UPPERCASE', 'lowercase', 'Title Case', 'Sentence case') and i < len(columns):
+                cell_fns[columns[i]] = [partial(change_case, casing=casing)]
+        return PlanStep(operation, params, reads=set(cell_fns), writes=set(cell_fns), row_local=True, cell_fns=cell_fns)
+
+    if operation == 'map_categorical_values':
+        column = params.get('column')
+        if not isinstance(params.get('unique_values'), list) or not isinstance(params.get('standard_format'), list):
+            raise OperationError("Missing unique_values or standard_format")
+        mapping = dict(zip(params['unique_values'], params['standard_format']))
+        cell_fns = {column: [partial(category_lookup, mapping)]} if column in columns else {}
+        return PlanStep(operation, params, reads=set(cell_fns), writes=set(cell_fns), row_local=True, cell_fns=cell_fns)
+
+    if operation == 'non_categorical_missing_values':
+        column = {params.get('column')}
+        action = params.get('action')
+        if action == 'Remove Rows':
+            return PlanStep(operation, params, reads=column, writes=set(), row_local=True, drops_rows=True)
+        if action == 'Fill with':
+            return PlanStep(operation, params, reads=column, writes=column, row_local=True)
+        if action == 'Fill with Mode':
+            return PlanStep(operation, params, reads=column, writes=column)
+        if action == 'Leave Blank':
+            return PlanStep(operation, params, reads=set(), writes=set(), row_local=True)
+
+    if operation == 'reformat_date':
+        date_columns = set(_date_columns(params, columns))
+        return PlanStep(operation, params, reads=date_columns, writes=date_columns, row_local=True)
+
+    if operation == 'delete_invalid_dates':
+        date_columns = set(_date_columns(params, columns))
+        return PlanStep(operation, params, reads=date_columns, writes=date_columns, row_local=True, drops_rows=True)
+
+    if operation == 'reformat_column':
+        column_index = params.get('columnIndex')
+        if not isinstance(column_index, int):
+            raise OperationError("Missing columnIndex")
+        column = {columns[column_index]} if 0 <= column_index < len(columns) else set()
+        return PlanStep(operation, params, reads=column, writes=column, row_local=True, drops_rows=True)
+
+    if operation == 'scale_features':
+        # Scaling uses whole-column statistics, so it is not row-local
+        scaled = {col for col in params.get('numerical_columns', [])
+                  if params.get('scaling_methods', {}).get(col) in ('Normalization', 'Standardization') and col in columns}
+        return PlanStep(operation, params, reads=scaled, writes=scaled)
+
+    if operation == 'get_cleaned_file':
+        column = {params.get('column_name')}
+        if params.get('task') != 'Resolve Outliers':
+            return PlanStep(operation, params, reads=set(), writes=set(), row_local=True, cell_fns={})
+        if params.get('method') == 'Remove':
+            return PlanStep(operation, params, reads=column, writes=set(), row_local=True, drops_rows=True)
+        return PlanStep(operation, params, reads=column, writes=column)
+
+    if operation == 'resolve_outliers_columns':
+        columns = set(params.get('columns') or [])
+        if params.get('method') == 'Remove':
+            return PlanStep(operation, params, reads=columns, writes=set(), row_local=True, drops_rows=True)
+        return PlanStep(operation, params, reads=columns, writes=columns)
+
+    # Anything else (e.g. numerical_missing_values rewrites NaN across the table) is a barrier
+    return PlanStep(operation, params, drops_rows=True)
+
+
+class LazyPlan:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.recorded = []
+        self._current_columns = list(columns)
+
+    def add(self, operation, params=None):
+        params = params or {}
+        if operation not in OPERATIONS:
+            raise OperationError(f"Step {len(self.recorded)}: unknown operation '{operation}'")
+        try:
+            step = describe_step(operation, params, self._current_columns)
+        except OperationError as e:
+            raise OperationError(f"Step {len(self.recorded)} ({operation}): {e}")
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            raise OperationError(f"Step {len(self.recorded)} ({operation}): invalid params ({type(e).__name__}: {e})")
+        step.sources = [len(self.recorded)]
+        self.recorded.append(step)
+        dropped = set(step.dropped_columns)
+        self._current_columns = [column for column in self._current_columns if column not in dropped]
+        return self
+
+    def optimize(self):
+        steps = self._prune_dead_columns(list(self.recorded))
+        steps = self._push_filters_down(steps)
+        return self._fuse_maps(steps)
+
+    def explain(self):
+        return {
+            "recorded": [{"operation": step.operation, "position": step.sources[0]} for step in self.recorded],
+            "optimized": [step.describe() for step in self.optimize()],
+        }
+
+    def execute(self, df):
+        report = []
+        steps = self.optimize()
+        for position, step in enumerate(steps):
+            report_progress(position, len(steps), f"Step {step.sources} ({step.operation})")
+            rows_before = len(df)
+            started = time.perf_counter()
+            if step.cell_fns is not None:
+                for column, fns in step.cell_fns.items():
+                    df[column] = map_distinct(df[column], partial(_compose, fns))
+            else:
+                try:
+                    df = OPERATIONS[step.operation](df, step.params)
+                except OperationError as e:
+                    raise OperationError(f"Step {step.sources} ({step.operation}): {e}")
+                except (KeyError, TypeError, ValueError) as e:
+                    raise OperationError(
+                        f"Step {step.sources} ({step.operation}): invalid params ({type(e).__name__}: {e})")
+            report.append({
+                "operation": step.operation,
+                "sources": step.sources,
+                "seconds": time.perf_counter() - started,
+                "rows_before": rows_before,
+                "rows_after": len(df),
+                "columns": len(df.columns),
+            })
+        return df, report
+
+    def _prune_dead_columns(self, steps):
+        # Walk backwards collecting columns that are dropped before anything reads them
+        dead = set()
+        kept = []
+        for step in reversed(steps):
+            if step.operation == 'drop_columns':
+                dead |= set(step.dropped_columns)
+            elif step.cell_fns is not None:
+                pruned = sorted(set(step.cell_fns) & dead)
+                if pruned:
+                    step = _copy_step(step)
+                    step.cell_fns = {column: fns for column, fns in step.cell_fns.items() if column not in dead}
+                    step.reads = step.writes = set(step.cell_fns)
+                    step.notes.append(f"skipped columns dropped later: {pruned}")
+                if not step.cell_fns:
+                    continue  # nothing left to do
+            elif (not step.drops_rows and step.writes is not ALL_COLUMNS and step.writes
+                  and step.reads is not ALL_COLUMNS and set(step.reads) <= set(step.writes) <= dead):
+                continue  # only transforms columns that are dropped later
+            else:
+                dead = set() if step.reads is ALL_COLUMNS else dead - set(step.reads)
+            kept.append(step)
+        return list(reversed(kept))
+
+    def _push_filters_down(self, steps):
+        moved = True
+        while moved:
+            moved = False
+            for i in range(1, len(steps)):
+                step, previous = steps[i], steps[i - 1]
+                if step.drops_rows and _can_move_ahead(step, previous):
+                    steps[i - 1], steps[i] = step, previous
+                    if "moved ahead of row-local transforms" not in step.notes:
+                        step.notes.append("moved ahead of row-local transforms")
+                    moved = True
+        return steps
+
+    def _fuse_maps(self, steps):
+        fused = []
+        for step in steps:
+            previous = fused[-1] if fused else None
+            if step.cell_fns is not None and previous is not None and previous.cell_fns is not None:
+                merged = _copy_step(previous)
+                merged.operation = 'fused_map'
+                for column, fns in step.cell_fns.items():
+                    merged.cell_fns[column] = merged.cell_fns.get(column, []) + fns
+                merged.reads = merged.writes = set(merged.cell_fns)
+                merged.sources = previous.sources + step.sources
+                merged.notes = ["fused consecutive per-cell maps into one pass per column"]
+                fused[-1] = merged
+            else:
+                fused.append(step)
+        return fused
+
+
+def _compose(fns, value):
+    for fn in fns:
+        value = fn(value)
+    return value
+
+def _copy_step(step):
+    copy = PlanStep(step.operation, step.params, step.reads, step.writes, step.row_local,
+                    step.drops_rows, step.dropped_columns,
+                    {column: list(fns) for column, fns in step.cell_fns.items()} if step.cell_fns is not None else None)
+    copy.sources = list(step.sources)
+    copy.notes = list(step.notes)
+    return copy
+
+def _can_move_ahead(row_filter, transform):
+    # A filter may run before a transform when the transform is row-local, keeps every
+    # row and column, and neither step reads or writes what the other writes
+    return (
+        transform.row_local
+        and not transform.drops_rows
+        and not transform.dropped_columns
+        and not row_filter.dropped_columns
+        and not _overlaps(transform.writes, row_filter.reads)
+        and not _overlaps(row_filter.writes, transform.reads)
+        and not _overlaps(row_filter.writes, transform.writes)
+    )
@@ -0,0 +1,108 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from date_engine import DETECTION_DATE_FORMATS
+from typed_columns import date_column, numeric_column
+
+# Tables wider than this are profiled on a thread pool
+PARALLEL_COLUMN_THRESHOLD = 32
+MAX_PROFILE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def numeric_invalid_mask(values, cache=None):
+    """True where a non-missing value cannot be converted with float()."""
+    _, valid = numeric_column(values, cache)
+    return ~valid & ~pd.isna(np.asarray(values, dtype=object))
+
+
+def profile_column(values, classification, cache=None):
+    started = time.perf_counter()
+    values = np.asarray(values, dtype=object)
+    missing = pd.isna(values) | (values == " ") | (values == "")
+    counts = {"missing": int(missing.sum())}
+    issues = []
+    if counts["missing"] > 0:
+        issues.append("Missing Values")
+
+    if classification[0] == 1:  # Numeric column
+        counts["non_numeric"] = int((~missing & numeric_invalid_mask(values, cache)).sum())
+        if counts["non_numeric"] > 0:
+            issues.append("Non-Numeric Values")
+
+    elif classification[3] == 1:  # Date column
+        # Only None and blank strings are skipped here; NaN is reported as an invalid date
+        skipped = np.array([value is None for value in values], dtype=bool) | (values == "") | (values == " ")
+        parsed = date_column(values, DETECTION_DATE_FORMATS, cache)
+        counts["invalid_dates"] = int((~skipped & ~parsed.valid).sum())
+        if counts["invalid_dates"] > 0:
+            issues.append("Invalid Dates")
+
+    counts["seconds"] = time.perf_counter() - started
+    return issues, counts
+
+
+def iter_completed(fn, tasks):
+    """Yield (position, fn(*task)) for every task as soon as it is done: in order for
+    few tasks, in completion order from a thread pool when there are many."""
+    if len(tasks) <= PARALLEL_COLUMN_THRESHOLD or MAX_PROFILE_WORKERS <= 1:
+        for position, task in enumerate(tasks):
+            yield position, fn(*task)
+        return
+    with ThreadPoolExecutor(max_workers=MAX_PROFILE_WORKERS) as pool:
+        futures = {pool.submit(fn, *task): position for position, task in enumerate(tasks)}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # The consumer stopped early (e.g. a streaming client went away)
+            for future in futures:
+                future.cancel()
+
+
+def iter_profiled_columns(data, columns, classifications, caches=None):
+    """Yield (position, issues, counts) per column as each one is profiled."""
+    if isinstance(data, pd.DataFrame):
+        frame = data
+    else:
+        frame = pd.DataFrame(data[1:], dtype=object)  # positional columns; converted once
+    column_values = [
+        frame.iloc[:, i].to_numpy(dtype=object) if i < frame.shape[1] else np.array([], dtype=object)
+        for i in range(len(columns))
+    ]
+    caches = caches if caches is not None else [None] * len(columns)
+    caches = list(caches) + [None] * (len(columns) - len(caches))
+
+    tasks = list(zip(column_values, classifications, caches))
+    for position, (issues, counts) in iter_completed(profile_column, tasks):
+        yield position, issues, counts
+
+
+def profile_columns(data, columns, classifications, caches=None):
+    """Profile every column of a table (header row first, or a stored DataFrame) in
+    one columnar pass. `caches` are per-column typed-column caches (typed_columns.py).
+
+    Returns the detect_issues dict under "issues" plus per-column counts and timings.
+    """
+    started = time.perf_counter()
+    results = {}
+    for position, issues, counts in iter_profiled_columns(data, columns, classifications, caches):
+        results[position] = (issues, counts)
+
+    issues = {}
+    column_counts = {}
+    for position in sorted(results):  # column order, whatever order they finished in
+        name = columns[position]
+        column_issues, counts = results[position]
+        column_counts[name] = counts
+        if column_issues:
+            issues[name] = column_issues
+
+    return {
+        "issues": issues,
+        "columns": column_counts,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,106 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+
+class RenderPoolBusy(Exception):
+    pass
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _init_worker():
+    # Import the plotting stack once per worker (Agg backend is set on import)
+    import rendering
+    rendering.warm_up()
+
+
+def _ping():
+    return True
+
+
+class RenderPool:
+    """Runs matplotlib/seaborn renders in pre-warmed worker processes.
+
+    pyplot keeps global state and is not thread-safe, so request threads hand
+    renders over to the pool instead of drawing themselves. At most `workers`
+    renders run at once and `max_pending` more may wait; a request that finds
+    no free slot within `queue_wait` seconds is rejected with RenderPoolBusy.
+    A render that is not done after `timeout` seconds gets RenderTimeout and the
+    worker processes are killed and replaced, since a running task cannot be
+    cancelled (renders in flight on the old pool fail with it). With workers=0
+    renders run in-process, one at a time.
+    """
+
+    def __init__(self, workers=2, max_pending=16, timeout=60, queue_wait=1):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.queue_wait = queue_wait
+        self._slots = threading.BoundedSemaphore(max(1, workers) + max_pending)
+        self._inline_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def start(self):
+        # Spawn and warm every worker up front instead of on the first requests
+        if self.workers > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+        else:
+            _init_worker()
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def render(self, render_fn, *args):
+        if not self._slots.acquire(timeout=self.queue_wait):
+            raise RenderPoolBusy("Too many charts are being rendered, try again shortly")
+        try:
+            if self.workers <= 0:
+                with self._inline_lock:
+                    return render_fn(*args)
+
+            executor = self._get_executor()
+            try:
+                future = executor.submit(render_fn, *args)
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                if not future.cancel():
+                    # Already running: the only way to stop it is to kill its process
+                    self._reset_executor(executor, terminate=True)
+                raise RenderTimeout(f"Chart rendering took longer than {self.timeout} seconds")
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool for the next request
+                self._reset_executor(executor)
+                raise
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # spawn: never fork the threaded server process
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _reset_executor(self, broken, terminate=False):
+        with self._executor_lock:
+            if self._executor is broken:
+                if terminate:
+                    # ProcessPoolExecutor has no public way to stop a running task
+                    for process in list((broken._processes or {}).values()):
+                        process.terminate()
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
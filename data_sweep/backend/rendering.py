@@ -0,0 +1,127 @@
+import io
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from chart_specs import LOD_THRESHOLD, bucket_min_max, index_min_max
+
+# Chart rendering functions. They only depend on their arguments so they can run
+# inside the render pool's worker processes (see render_pool.py).
+
+
+def warm_up():
+    # Draw and discard a tiny figure so fonts and backends are loaded before the first request
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def render_boxen_with_outliers(df, column, outlier_mask, scale, lod_threshold=None):
+    lod_threshold = LOD_THRESHOLD if lod_threshold is None else lod_threshold
+    outliers = df[outlier_mask]
+    normal_data = df[~outlier_mask]
+    num_points = len(df)
+    point_size = 10 if num_points > 500 else 30
+    fig_width = 10 if num_points > 500 else 5
+
+    plt.figure(figsize=(fig_width, 6))
+    sns.boxenplot(data=df, x=column, color="green", showfliers=False)
+    if len(normal_data) > lod_threshold:
+        # Level of detail: one min/max pair per pixel bucket, shaded by how many rows it covers
+        points, counts = bucket_min_max(normal_data[column].to_numpy(), scale)
+        plt.scatter(points, np.zeros(len(points)), c=counts, cmap='Blues', norm=matplotlib.colors.LogNorm(),
+                    s=point_size, label='Normal Data (binned)')
+    else:
+        sns.scatterplot(data=normal_data, x=column, y=[0] * len(normal_data), color='blue', s=point_size, label='Normal Data')
+    # Outliers are always drawn individually
+    sns.scatterplot(data=outliers, x=column, y=[0] * len(outliers), color='red', s=point_size * 1.5, label='Outliers')
+
+    plt.xscale(scale)
+
+    plt.title(f'{scale.upper()} Scale Plot for {column} (Total: {num_points} values, {len(outliers)} outliers)')
+
+    # Save the plot to a BytesIO object and return it
+    img = io.BytesIO()
+    plt.savefig(img, format='png')
+    img.seek(0)
+    plt.close()  # Close the plot to free memory
+    return img
+
+
+def generate_chart(column_name, column_data, classification, lod_threshold=None):
+    lod_threshold = LOD_THRESHOLD if lod_threshold is None else lod_threshold
+    chart_type = None
+    if classification[0] == 1:
+        chart_type = 'numerical'
+    elif classification[1] == 1:
+        chart_type = 'categorical'
+    elif classification[2] == 1:
+        chart_type = 'non-categorical'
+    elif classification[3] == 1:
+        chart_type = 'date'
+
+    # Create the appropriate plot based on classification
+    fig, ax = plt.subplots()
+
+    if chart_type == 'numerical':
+        # Ensure only valid numeric entries
+        column_data = [
+            float(i) if isinstance(i, (int, float)) else None
+            for i in column_data if i != '' and i is not None
+        ]
+        # Remove any None values
+        column_data = [i for i in column_data if i is not None]
+        
+        ax.hist(column_data, bins=20, edgecolor='black')  # You can adjust the number of bins
+        ax.set_title(f"Numerical Data: {column_name}")
+        ax.set_xlabel('Value')
+        ax.set_ylabel('Frequency')
+
+    elif chart_type == 'categorical':
+        column_data = column_data[1:]
+        # Count the occurrences of each category
+        category_counts = pd.Series(column_data).value_counts()
+        
+        # Plot as a pie chart
+        ax.pie(category_counts, labels=category_counts.index, autopct='%1.1f%%', startangle=90)
+        ax.set_title(f"Categorical Data: {column_name}")
+        ax.axis('equal')
+
+    elif chart_type == 'non-categorical':
+        # Count the non-empty values and missing (null/empty) values
+        non_empty_values = [val for val in column_data if val != '' and val is not None]
+        missing_values = len(column_data) - len(non_empty_values)
+
+        ax.bar(['Non-Empty', 'Missing'], [len(non_empty_values), missing_values])
+        ax.set_title(f"Non-Categorical Data: {column_name}")
+        ax.set_ylabel('Count')
+
+    elif chart_type == 'date':
+        dates = pd.to_datetime(column_data, errors='coerce')
+        
+        if dates.isnull().all():
+            ax.text(0.5, 0.5, "No valid dates available", ha='center', va='center', fontsize=12)
+        else:
+            # Use a line plot instead of scatter
+            if len(dates) > lod_threshold:
+                # Level of detail: min/max date per index bucket, no per-row markers
+                lod_dates, lod_positions = index_min_max(dates)
+                ax.plot(lod_dates, lod_positions, linestyle='-', color='teal')
+            else:
+                ax.plot(dates, range(len(dates)), linestyle='-', color='teal', marker='o')
+            ax.set_title(f"Date Data: {column_name}")
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Index')
+
+    # Save the plot to a byte stream
+    img_stream = io.BytesIO()
+    fig.savefig(img_stream, format='png')
+    img_stream.seek(0)
+    plt.close(fig)
+
+    return img_stream
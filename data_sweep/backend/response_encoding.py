@@ -0,0 +1,124 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+from flask import Response, current_app, jsonify, request
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encoding
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: Arrow IPC responses
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd compression
+    zstandard = None
+
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SSE_MIMETYPE = 'text/event-stream'
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+# How tables (header row + rows) are sent back, picked from the request headers:
+#   Accept: application/vnd.apache.arrow.stream  -> Arrow IPC stream (needs pyarrow)
+#   X-Json-Encoder: fast                         -> orjson, numpy arrays encoded directly (NaN becomes null)
+#   Accept-Encoding: zstd / gzip                 -> compressed body
+# Without any of these the response is the same list-of-lists JSON as always.
+
+
+def _as_frame(table):
+    if isinstance(table, pd.DataFrame):
+        return table
+    return pd.DataFrame(table[1:], columns=table[0])
+
+def _as_table(table):
+    if isinstance(table, pd.DataFrame):
+        return [table.columns.tolist()] + table.values.tolist()
+    return table
+
+def _fast_json(table):
+    if not isinstance(table, pd.DataFrame):
+        return orjson.dumps(table, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    header = orjson.dumps([str(column) for column in table.columns])
+    values = table.to_numpy()
+    if values.dtype == object or len(values) == 0:
+        rows = orjson.dumps(values.tolist(), option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        # Homogeneous numeric tables are encoded straight from the numpy buffer
+        rows = orjson.dumps(np.ascontiguousarray(values), option=orjson.OPT_SERIALIZE_NUMPY)
+    if rows == b'[]':
+        return b'[' + header + b']'
+    return b'[' + header + b',' + rows[1:]
+
+def _arrow_column(series):
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns are sent as strings
+        return pa.array([None if pd.isna(value) else str(value) for value in series], type=pa.string())
+
+def _arrow_ipc(table):
+    frame = _as_frame(table)
+    arrow_table = pa.Table.from_arrays(
+        [_arrow_column(frame.iloc[:, i]) for i in range(frame.shape[1])],
+        names=[str(column) for column in frame.columns],
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+def _compress(response):
+    offered = ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding is None or len(response.get_data()) < MIN_COMPRESS_BYTES:
+        return response
+    body = response.get_data()
+    if encoding == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    else:
+        body = gzip.compress(body, compresslevel=5)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def table_body_response(table):
+    """Encode a table (list of lists with the header first, or a DataFrame) for this request."""
+    wants_arrow = (
+        pa is not None
+        and request.accept_mimetypes.best_match([JSON_MIMETYPE, ARROW_MIMETYPE]) == ARROW_MIMETYPE
+    )
+    if wants_arrow:
+        response = Response(_arrow_ipc(table), mimetype=ARROW_MIMETYPE)
+    elif orjson is not None and request.headers.get('X-Json-Encoder', '').lower() == 'fast':
+        response = Response(_fast_json(table), mimetype=JSON_MIMETYPE)
+    else:
+        response = jsonify(_as_table(table))
+    response.vary.add('Accept')
+    return _compress(response)
+
+def stream_records_response(records):
+    """Stream JSON records as they are produced: Server-Sent Events ("data:" messages)
+    when the client accepts text/event-stream, JSON lines otherwise. Streams are not
+    compressed, since compression would hold records back."""
+    dumps = current_app.json.dumps  # the generator runs after the request context is gone
+    if request.accept_mimetypes.best_match([NDJSON_MIMETYPE, SSE_MIMETYPE]) == SSE_MIMETYPE:
+        mimetype = SSE_MIMETYPE
+        body = (f"data: {dumps(record)}\n\n" for record in records)
+    else:
+        mimetype = NDJSON_MIMETYPE
+        body = (dumps(record) + "\n" for record in records)
+    response = Response(body, mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep proxies from buffering the stream
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,102 @@
+import importlib
+import os
+import time
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional: only needed for production serving
+    BaseApplication = None
+
+# Production entry point: `python serve.py` serves the app with gunicorn's prefork
+# workers instead of Flask's single-process development server (`python app.py`).
+#
+#   DATASWEEP_HOST, DATASWEEP_PORT   bind address (0.0.0.0, then $PORT or 5000)
+#   DATASWEEP_WORKERS                worker processes (CPU count)
+#   DATASWEEP_THREADS                request threads per worker (4; 1 gives plain sync workers)
+#   DATASWEEP_TIMEOUT                seconds a worker may stay unresponsive before it is restarted (300)
+#   DATASWEEP_KEEPALIVE              seconds to keep idle client connections open (5)
+#   DATASWEEP_MAX_REQUEST_BYTES      largest request body, answered with 413 beyond (512 MiB)
+#   DATASWEEP_MAX_REQUESTS           restart a worker after this many requests, 0 for never (0)
+#
+# The heavy libraries are imported in the parent before it forks, so every worker
+# shares their pages instead of loading its own copy.
+#
+# Every worker is its own process: stored datasets (dataset_id), the chart cache and
+# background jobs live in the worker that created them. Clients using those need
+# DATASWEEP_WORKERS=1 (scale with DATASWEEP_THREADS instead) or a proxy that keeps
+# each client on one worker. Requests that send their data inline work with any
+# number of workers.
+
+PRELOAD_MODULES = [
+    'numpy', 'pandas', 'scipy.stats', 'sklearn.ensemble', 'sklearn.neighbors',
+    'matplotlib', 'seaborn',
+]
+
+
+def serving_config():
+    threads = int(os.environ.get('DATASWEEP_THREADS', 4))
+    max_requests = int(os.environ.get('DATASWEEP_MAX_REQUESTS', 0))
+    host = os.environ.get('DATASWEEP_HOST', '0.0.0.0')
+    port = os.environ.get('DATASWEEP_PORT', os.environ.get('PORT', 5000))
+    return {
+        'bind': f"{host}:{port}",
+        'workers': int(os.environ.get('DATASWEEP_WORKERS', os.cpu_count() or 1)),
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': int(os.environ.get('DATASWEEP_TIMEOUT', 300)),
+        'graceful_timeout': 30,
+        'keepalive': int(os.environ.get('DATASWEEP_KEEPALIVE', 5)),
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,  # so workers do not all restart together
+        # Request line and header limits; the body limit is MAX_CONTENT_LENGTH below
+        'limit_request_line': 8190,
+        'limit_request_fields': 100,
+        'limit_request_field_size': 8190,
+        'preload_app': True,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }
+
+
+def preload():
+    # Runs once in the parent, before any worker is forked
+    started = time.perf_counter()
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    import rendering
+    rendering.warm_up()  # font cache and Agg backend, shared with the workers too
+    print(f"Preloaded {', '.join(PRELOAD_MODULES)} in {time.perf_counter() - started:.1f}s")
+
+
+def post_worker_init(worker):
+    # Render processes are spawned per worker, never inherited across the fork
+    from app import render_pool
+    render_pool.start()
+
+
+def worker_exit(server, worker):
+    from app import render_pool
+    render_pool.shutdown()
+
+
+if BaseApplication is not None:
+    class DataSweepServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            preload()
+            from app import app
+            app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('DATASWEEP_MAX_REQUEST_BYTES', 512 * 1024 ** 2))
+            return app
+
+
+if __name__ == '__main__':
+    if BaseApplication is None:
+        raise SystemExit("Production serving needs gunicorn: pip install gunicorn")
+    DataSweepServer(serving_config()).run()
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+# Mergeable sketches for approximate statistics on large columns. Each sketch can
+# be built chunk by chunk (update) and combined with one built elsewhere (merge),
+# e.g. per chunk of a file or per worker.
+#
+# Error bounds with the defaults:
+#   KLLSketch(k=200)     quantiles: rank error within ~1.3% of the count at 99%
+#                        confidence (exact while fewer than k values were seen)
+#   HyperLogLog(p=14)    distinct count: ~0.8% relative standard error (1.04 / sqrt(2**p))
+#   Moments              count, mean, variance and skewness are exact (up to float rounding)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+class KLLSketch:
+    """KLL quantile sketch: a stack of compactors, each holding items of weight 2**level."""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            # Nothing compacted yet: every value is still here, so interpolate between
+            # them the way pandas' quantile does and match the exact statistics
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        # Item whose weighted rank first reaches q of the total
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[min(position, len(items) - 1)])
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller capacities (factor 2/3)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) < self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # Keep one item back when the count is odd, promote every other item
+            leftover, items = (items[:1], items[1:]) if len(items) % 2 else (items[:0], items)
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level = 0  # capacities shift when the stack grows
+
+
+def _bit_length(values):
+    # Exact bit length of uint64 values, in two 32-bit halves so float64 stays exact
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def hash_values(values):
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if series.dtype == object:
+        # repr keeps 1, 1.0 and '1' apart, like the chart cache keys
+        series = series.map(repr)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch with 2**p registers."""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        hashes = hash_values(values)
+        buckets = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(rest) + 1  # position of the first 1 bit
+        np.maximum.at(self.registers, buckets, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+
+class Moments:
+    """Streaming count/mean/M2/M3, merged with the pairwise update formulas."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        chunk = Moments()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        deviations = values - chunk.mean
+        chunk.m2 = float(np.sum(deviations ** 2))
+        chunk.m3 = float(np.sum(deviations ** 3))
+        chunk.min, chunk.max = float(values.min()), float(values.max())
+        return self.merge(chunk)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        self.m3 = (self.m3 + other.m3 + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+                   + 3 * delta * (n_a * other.m2 - n_b * self.m2) / n)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * n_a * n_b / n
+        self.mean = self.mean + delta * n_b / n
+        self.count = n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.m2 / (self.count - ddof))) if self.count > ddof else np.nan
+
+    def skew(self):
+        # Bias-corrected sample skewness, as pandas' Series.skew
+        n = self.count
+        if n < 3:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        g1 = (self.m3 / n) / (self.m2 / n) ** 1.5
+        return float(g1 * np.sqrt(n * (n - 1)) / (n - 2))
+
+
+class ColumnSketch:
+    """Quantiles, distinct count and moments of one numeric column."""
+
+    def __init__(self):
+        self.quantiles = KLLSketch()
+        self.distinct = HyperLogLog()
+        self.moments = Moments()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.quantiles.update(values)
+        self.distinct.update(values)
+        self.moments.update(values)
+        return self
+
+    def merge(self, other):
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.moments.merge(other.moments)
+        return self
+
+    def quantile(self, q):
+        return self.quantiles.quantile(q)
+
+
+def sketch_column(values, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ColumnSketch of `values`, built chunk by chunk."""
+    values = np.asarray(values, dtype=float)
+    sketch = ColumnSketch()
+    for start in range(0, len(values), chunk_size):
+        sketch.update(values[start:start + chunk_size])
+    return sketch
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chunked import read_chunks, run_chunked
+from operations import OperationError, run_pipeline
+
+ROWS = 150  # below the KLL sketch's k, so medians and quartiles are exact
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.normal(50, 10, ROWS).round(2).astype(str)
+    values[::7] = ""            # missing numbers
+    values[3] = "not a number"
+    values[4] = ""              # an even count left, so the median interpolates
+    values[5] = "400"           # an outlier
+    frame = pd.DataFrame({
+        "value": values,
+        "city": rng.choice(["paris", "lyon", "", "nice"], ROWS),
+        "kind": rng.choice(["a", "b", "c"], ROWS),
+        "note": [f"note {i % 9}" for i in range(ROWS)],
+    })
+    path = tmp_path / "input.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def in_memory(csv_path, steps):
+    # The in-memory pipeline on the file read the way the chunked runner reads it
+    frame = pd.concat(read_chunks(csv_path, ROWS), ignore_index=True)
+    result, _ = run_pipeline(frame, steps)
+    return result
+
+
+def chunked(csv_path, tmp_path, steps, chunk_size=40):
+    output = str(tmp_path / "output.csv")
+    summary = run_chunked(csv_path, output, steps, chunk_size)
+    return pd.read_csv(output, keep_default_na=False), summary
+
+
+def assert_same_table(chunked_result, expected, tmp_path):
+    path = tmp_path / "expected.csv"
+    expected.to_csv(path, index=False)
+    expected = pd.read_csv(path, keep_default_na=False)
+    pd.testing.assert_frame_equal(chunked_result, expected, check_exact=False, rtol=1e-9)
+
+
+PIPELINES = [
+    [{"operation": "apply_letter_casing",
+      "params": {"columns": ["value", "city", "kind", "note"], "casingSelections": ["None", "UPPERCASE", "None", "Title Case"]}},
+     {"operation": "map_categorical_values", "params": {"column": "kind", "unique_values": ["a"], "standard_format": ["alpha"]}},
+     {"operation": "drop_columns", "params": {"columns": ["note"]}}],
+    [{"operation": "non_categorical_missing_values", "params": {"column": "city", "action": "Fill with Mode"}},
+     {"operation": "dedupe", "params": {"columns": ["city", "kind"]}}],
+    [{"operation": "numerical_missing_values", "params": {"column": "value", "action": "Fill/Replace with Mean"}},
+     {"operation": "scale_features",
+      "params": {"numerical_columns": ["value"], "scaling_methods": {"value": "Standardization"}}}],
+    [{"operation": "numerical_missing_values", "params": {"column": "value", "action": "Fill/Replace with Median"}}],
+    [{"operation": "numerical_missing_values", "params": {"column": "value", "action": "Remove Rows"}},
+     {"operation": "get_cleaned_file",
+      "params": {"column_name": "value", "task": "Resolve Outliers", "method": "Cap and Floor"}}],
+]
+
+
+@pytest.mark.parametrize("steps", PIPELINES)
+def test_chunked_run_matches_in_memory_pipeline(csv_path, tmp_path, steps):
+    result, summary = chunked(csv_path, tmp_path, steps)
+    assert summary["rows_in"] == ROWS
+    assert summary["rows_out"] == len(result)
+    assert_same_table(result, in_memory(csv_path, steps), tmp_path)
+
+
+def test_statistics_passes_are_counted(csv_path, tmp_path):
+    _, summary = chunked(csv_path, tmp_path, PIPELINES[2])
+    assert summary["passes"] == 3  # one per statistics step plus the writing pass
+
+
+def test_failed_run_leaves_no_output(csv_path, tmp_path):
+    steps = [{"operation": "dedupe", "params": {"columns": ["missing"]}}]
+    with pytest.raises(OperationError):
+        chunked(csv_path, tmp_path, steps)
+    assert not (tmp_path / "output.csv").exists()
+    assert not (tmp_path / "output.csv.part").exists()
+
+
+def test_row_dependent_operations_are_refused(csv_path, tmp_path):
+    with pytest.raises(OperationError, match="cannot run in chunked mode"):
+        chunked(csv_path, tmp_path, [{"operation": "remove_columns", "params": {"columnsToRemove": ["note"]}}])
+
+
+INTEGER_STEPS = [
+    [{"operation": "numerical_missing_values", "params": {"column": "count", "action": action}}]
+    for action in ("Fill/Replace with Mean", "Leave Blank", "Remove Rows")
+] + [
+    [{"operation": "get_cleaned_file",
+      "params": {"column_name": "count", "task": "Resolve Outliers", "method": "Cap and Floor"}}],
+    [{"operation": "scale_features",
+      "params": {"numerical_columns": ["count"], "scaling_methods": {"count": "Normalization"}}}],
+]
+
+
+@pytest.mark.parametrize("steps", INTEGER_STEPS)
+def test_integer_column_is_written_in_one_format(tmp_path, steps):
+    # Chunks of two rows: the first ones hold only integers, the last one a blank
+    path = tmp_path / "counts.csv"
+    path.write_text("id,count\na,1\nb,2\nc,3\nd,4\ne,\nf,6\n")
+    output = tmp_path / "output.csv"
+    run_chunked(str(path), str(output), steps, chunk_size=2)
+
+    # The in-memory pipeline converts the whole column at once
+    frame = pd.concat(read_chunks(str(path), 2), ignore_index=True)
+    frame["count"] = pd.to_numeric(frame["count"], errors='coerce')
+    expected, _ = run_pipeline(frame, steps)
+    assert output.read_text() == expected.to_csv(index=False)
+
+
+@pytest.mark.parametrize("step", [
+    {"operation": "numerical_missing_values", "params": {"column": "missing", "action": "Fill/Replace with Mean"}},
+    {"operation": "numerical_missing_values", "params": {"column": "missing", "action": "Leave Blank"}},
+    {"operation": "get_cleaned_file",
+     "params": {"column_name": "missing", "task": "Resolve Outliers", "method": "Remove"}},
+])
+def test_unknown_column_is_an_operation_error(csv_path, tmp_path, step):
+    with pytest.raises(OperationError, match="Column not found"):
+        chunked(csv_path, tmp_path, [step])
@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+from dataset_store import DatasetNotFound, DatasetStore, compact_frame, frame_to_table, table_to_frame
+from versions import HistoryError
+
+CLASSIFICATIONS = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 0], [1, 0, 0, 0]]
+TABLE = [["count", "label", "note", "score"]] + [
+    [i % 100, f"label{i % 3}", f"note {i}", i / 4] for i in range(2000)
+]
+
+
+def stored_compact(store):
+    frame, _ = compact_frame(table_to_frame(TABLE), CLASSIFICATIONS)
+    return store.put(frame)
+
+
+def test_compact_frame_round_trips_the_table():
+    frame, report = compact_frame(table_to_frame(TABLE), CLASSIFICATIONS)
+    assert str(frame['count'].dtype) == 'int8'
+    assert isinstance(frame['label'].dtype, pd.CategoricalDtype)
+    assert str(frame['score'].dtype) == 'float32'
+    assert frame['note'].dtype == object
+    assert report['label']['bytes_after'] < report['label']['bytes_before']
+    assert frame_to_table(frame) == TABLE
+
+
+def test_compaction_survives_an_operation_on_another_column():
+    store = DatasetStore()
+    dataset_id = stored_compact(store)
+    before = store.info(dataset_id)["bytes"]
+
+    # A route's casing change: table out, DataFrame rebuilt from lists, one column edited
+    table = frame_to_table(store.get(dataset_id))
+    df = pd.DataFrame(table[1:], columns=table[0])
+    df['note'] = df['note'].str.upper()
+    store.replace(dataset_id, df, 'apply_letter_casing')
+
+    frame = store.get(dataset_id)
+    assert str(frame['count'].dtype) == 'int8'
+    assert isinstance(frame['label'].dtype, pd.CategoricalDtype)
+    assert str(frame['score'].dtype) == 'float32'
+    # Only the changed column was added to the history
+    note_bytes = int(df['note'].memory_usage(deep=True, index=False))
+    assert store.info(dataset_id)["bytes"] <= before + note_bytes * 1.1
+    assert frame_to_table(frame)[1] == [0, "label0", "NOTE 0", 0.0]
+
+    store.undo(dataset_id)
+    assert frame_to_table(store.get(dataset_id)) == TABLE
+
+
+def test_snapshot_pairs_frame_and_caches_of_one_version():
+    store = DatasetStore()
+    dataset_id = stored_compact(store)
+    frame, caches, version_id = store.snapshot(dataset_id)
+    assert len(caches) == frame.shape[1]
+    assert version_id == store.info(dataset_id)["version"]
+    values, cache = store.column(dataset_id, 2)
+    assert cache is caches[2]
+    assert list(values[:2]) == ["note 0", "note 1"]
+
+
+def test_replace_refuses_a_frame_read_from_an_older_version():
+    store = DatasetStore()
+    dataset_id = stored_compact(store)
+    frame, _, first = store.snapshot(dataset_id)
+
+    # Another request filters the same version and commits first
+    info, _, _ = store.replace(dataset_id, frame.iloc[1:], 'filter', base_version=first)
+    with pytest.raises(HistoryError):
+        store.replace(dataset_id, frame.iloc[:1], 'filter', base_version=first)
+    assert store.info(dataset_id) == info
+
+    # Read again, the second edit applies on top of the first
+    frame, _, second = store.snapshot(dataset_id)
+    info, delta, _ = store.replace(dataset_id, frame.iloc[1:], 'filter', base_version=second, delta_from=first)
+    assert info["rows"] == len(TABLE) - 3
+    assert delta["removed_rows"] == [0, 1]
+
+
+def test_replace_state_falls_back_to_the_frame_without_a_delta():
+    store = DatasetStore()
+    dataset_id = stored_compact(store)
+    frame, _, first = store.snapshot(dataset_id)
+    info, delta, full = store.replace(dataset_id, frame.iloc[::-1], 'reverse', base_version=first, delta_from=first)
+    assert delta is None
+    assert frame_to_table(full)[1:] == TABLE[1:][::-1]
+    assert store.replace(dataset_id, full, 'same', delta_from=None)[1:] == (None, None)
+
+
+def test_missing_dataset():
+    store = DatasetStore()
+    with pytest.raises(DatasetNotFound):
+        store.get('missing')
+
+
+def test_overlapping_requests_on_one_dataset_conflict():
+    import app as app_module
+    client = app_module.app.test_client()
+    dataset_id = app_module.dataset_store.put(table_to_frame(TABLE[:4]))
+    body = {"dataset_id": dataset_id, "columns": ["label"], "casingSelections": ["UPPERCASE"]}
+
+    # A slow request reads the dataset; a quicker one commits before it finishes
+    with app_module.app.test_request_context('/apply_letter_casing', method='POST', json=body):
+        table = app_module.request_table()
+        assert client.post('/remove_columns', json={
+            "dataset_id": dataset_id, "columns": TABLE[0], "columnsToRemove": ["note"],
+        }).status_code == 200
+        with pytest.raises(HistoryError) as conflict:
+            app_module.table_response(table)
+        response, status = app_module.history_error(conflict.value)
+
+    assert status == 409
+    assert "reload it and try again" in response.get_json()["error"]
+    assert app_module.dataset_store.info(dataset_id)["columns"] == ["count", "label", "score"]
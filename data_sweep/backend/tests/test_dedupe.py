@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dedupe import ChunkedDedupe, row_index
+from operations import remove_columns
+
+ROWS = [
+    [1, "a", None],
+    [1.0, "a", None],     # 1 and 1.0 are the same value, as in drop_duplicates
+    [2, "b", np.nan],
+    [2, "b", np.nan],     # NaN equals NaN
+    [1, "A", None],
+    ["1", "a", None],     # but the string '1' is not 1
+    [3, "c", "x"],
+    [2, "b", np.nan],
+]
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(ROWS, columns=["n", "s", "z"], dtype=object)
+
+
+@pytest.mark.parametrize("columns", [None, ["n"], ["s"], ["n", "s"], ["z", "s"]])
+def test_row_index_matches_drop_duplicates(frame, columns):
+    index = row_index(frame, columns)
+    expected = frame.duplicated(subset=columns).to_numpy()
+    assert index.duplicated.tolist() == expected.tolist()
+    assert index.report()["duplicate_rows"] == int(expected.sum())
+
+
+def test_groups_do_not_depend_on_hashes(frame, monkeypatch):
+    # Every row hashing alike must not merge different rows
+    monkeypatch.setattr(pd.util, "hash_pandas_object",
+                        lambda obj, **kwargs: pd.Series(np.zeros(len(obj), dtype=np.uint64)))
+    assert row_index(frame).duplicated.tolist() == frame.duplicated().tolist()
+    removed = remove_columns(frame, {"columnsToRemove": ["z"]})
+    assert removed.equals(frame.drop_duplicates().drop(columns=["z"]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_row_index_matches_drop_duplicates_on_many_columns(seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.integers(0, 3, (3000, 8)), dtype=object)
+    assert row_index(frame).duplicated.tolist() == frame.duplicated().tolist()
+
+
+def test_report_lists_the_largest_groups(frame):
+    report = row_index(frame).report(limit=1)
+    assert report["rows"] == len(ROWS)
+    assert report["largest_groups"] == [{"first_row": 2, "count": 3}]
+
+
+def test_unknown_column(frame):
+    with pytest.raises(KeyError):
+        row_index(frame, ["missing"])
+
+
+def test_chunked_dedupe_matches_drop_duplicates():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"a": rng.integers(0, 5, 500).astype(str), "b": rng.integers(0, 4, 500).astype(str)})
+    dedupe = ChunkedDedupe(["a", "b"])
+    kept = pd.concat([dedupe.filter(frame.iloc[start:start + 64]) for start in range(0, len(frame), 64)])
+    assert kept.equals(frame.drop_duplicates(subset=["a", "b"]))
+
+
+def test_chunked_dedupe_unknown_column():
+    with pytest.raises(KeyError, match="missing"):
+        ChunkedDedupe(["missing"]).filter(pd.DataFrame({"a": ["1"]}))
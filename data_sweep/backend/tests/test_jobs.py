@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from jobs import JobQueue, JobQueueFull, report_progress
+
+TIMEOUT = 10
+
+
+def wait_until_done(job):
+    deadline = time.monotonic() + TIMEOUT
+    while not job.done:
+        assert time.monotonic() < deadline, f"job still {job.status}"
+        job.wait_for_change(timeout=0.1)
+    return job
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1, max_pending=2, max_finished=10)
+    yield queue
+    queue._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def blocking_work(started, release, steps=1000):
+    # Reports progress until released, the way the long-running operations do
+    started.set()
+    for done in range(steps):
+        report_progress(done, steps, message=f"step {done}")
+        if release.wait(0.01):
+            return "finished"
+    return "finished"
+
+
+def test_report_progress_outside_a_job_does_nothing():
+    report_progress(1, 2, message="ignored")
+
+
+def test_job_records_result_and_progress(queue):
+    job = wait_until_done(queue.submit("sum", lambda values: sum(values), [1, 2, 3]))
+    assert job.status == "done"
+    assert job.result == 6
+    assert job.progress == 1.0
+    assert job.started is not None and job.finished >= job.started
+
+
+def test_failed_job_keeps_its_error(queue):
+    def fail():
+        raise ValueError("bad input")
+
+    job = wait_until_done(queue.submit("fail", fail))
+    assert job.status == "failed"
+    assert job.error == "bad input"
+
+
+def test_running_job_stops_at_its_next_checkpoint(queue):
+    started, release = threading.Event(), threading.Event()
+    job = queue.submit("long", blocking_work, started, release)
+    assert started.wait(TIMEOUT)
+
+    queue.cancel(job.job_id)
+    wait_until_done(job)
+    assert job.status == "cancelled"
+    assert job.result is None
+    assert job.message.startswith("step")  # it got as far as reporting progress
+
+
+def test_queued_job_is_cancelled_before_it_starts(queue):
+    started, release = threading.Event(), threading.Event()
+    running = queue.submit("long", blocking_work, started, release)
+    assert started.wait(TIMEOUT)
+    ran = threading.Event()
+    queued = queue.submit("queued", ran.set)
+    assert queued.status == "queued"
+
+    queue.cancel(queued.job_id)
+    assert queued.status == "cancelled"
+    release.set()
+    wait_until_done(running)
+    assert running.status == "done"
+    assert not ran.is_set()
+    assert queue.stats()["cancelled"] == 1
+
+
+def test_full_queue_refuses_jobs(queue):
+    started, release = threading.Event(), threading.Event()
+    queue.submit("long", blocking_work, started, release)
+    assert started.wait(TIMEOUT)
+    queue.submit("waiting", time.sleep, 0)
+    queue.submit("waiting", time.sleep, 0)
+    with pytest.raises(JobQueueFull):
+        queue.submit("one too many", time.sleep, 0)
+    release.set()
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+TABLE = [["name", "city"], ["ann", "paris"], ["bob", "lyon"], ["ann", "paris"]]
+STEPS = [{"operation": "apply_letter_casing", "params": {"columns": ["name"], "casingSelections": ["UPPERCASE"]}}]
+
+
+def test_job_route_gives_the_routes_own_response(client):
+    body = {"data": TABLE, "steps": STEPS}
+    direct = client.post('/pipeline', json=body)
+
+    response = client.post('/jobs', json={"route": "/pipeline", "body": body})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    wait_until_done(app_module.job_queue.get(job_id))
+
+    assert client.get(f'/jobs/{job_id}').get_json()["status"] == "done"
+    result = client.get(f'/jobs/{job_id}/result')
+    assert result.status_code == direct.status_code
+    assert result.get_json()["data"] == direct.get_json()["data"]
+    assert [step["rows_after"] for step in result.get_json()["steps"]] == [3]
+
+    events = client.get(f'/jobs/{job_id}/events').get_data(as_text=True)
+    assert events.startswith("data: ") and events.endswith("\n\n")
+
+
+def test_job_route_errors(client):
+    assert client.post('/jobs', json={"route": "/nowhere", "body": {}}).status_code == 404
+    assert client.post('/jobs', json={"route": "/jobs", "body": {}}).status_code == 400
+    assert client.get('/jobs/unknown').status_code == 404
+    assert client.delete('/jobs/unknown').status_code == 404
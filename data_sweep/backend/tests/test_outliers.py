@@ -0,0 +1,31 @@
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+from outliers import _fit_detector
+
+
+def clustered_values():
+    rng = np.random.default_rng(3)
+    clusters = np.concatenate([rng.normal(0, 1, (600, 2)), rng.normal(8, 0.5, (600, 2))])
+    return np.concatenate([clusters, rng.uniform(-10, 20, (30, 2))])
+
+
+def test_subsampled_lof_labels_its_sample_like_fit_predict():
+    values = clustered_values()
+    _, mask = _fit_detector(values, 'LOF', max_train_rows=800, n_jobs=1)
+
+    sample = np.random.default_rng(0).choice(len(values), 800, replace=False)
+    expected = LocalOutlierFactor(n_jobs=1).fit_predict(values[sample]) == -1
+    assert (mask[sample] == expected).all()
+
+
+def test_subsampled_lof_scores_the_other_rows_against_the_sample():
+    values = clustered_values()
+    model, mask = _fit_detector(values, 'LOF', max_train_rows=800, n_jobs=1)
+
+    sample = np.random.default_rng(0).choice(len(values), 800, replace=False)
+    rest = np.setdiff1d(np.arange(len(values)), sample)
+    assert (mask[rest] == (model.predict(values[rest]) == -1)).all()
+    # Most of the scattered points are caught, few of the clustered ones
+    assert mask[1200:].mean() > 0.5
+    assert mask[:1200].mean() < 0.1
@@ -0,0 +1,38 @@
+import pytest
+
+import app as app_module
+
+TABLE = [["value"], [1], [2], [3], [4], [100]]
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def post(client, **params):
+    return client.post('/outliers_graph', json={
+        "data": TABLE, "column_name": "value", "task": "Resolve Outliers", "method": "Cap and Floor",
+        "response_format": "spec", **params,
+    })
+
+
+@pytest.mark.parametrize("params, error", [
+    ({"max_iterations": "abc"}, "max_iterations must be an integer"),
+    ({"max_iterations": None}, "max_iterations must be an integer"),
+    ({"max_iterations": 0}, "max_iterations must be a positive integer"),
+    ({"max_iterations": 2.5}, "max_iterations must be a positive integer"),
+    ({"tolerance": "abc"}, "tolerance must be a number"),
+    ({"tolerance": -0.1}, "tolerance must not be negative"),
+    ({"tolerance": "nan"}, "tolerance must not be negative"),
+    ({"lod_threshold": -1}, "lod_threshold must be a non-negative integer"),
+])
+def test_invalid_resolve_parameters_are_a_400(client, params, error):
+    response = post(client, **params)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_valid_resolve_parameters_are_accepted(client):
+    response = post(client, max_iterations="3", tolerance=0.5)
+    assert response.status_code == 200
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from operations import OperationError, run_pipeline
+from planner import LazyPlan
+
+TABLE = [["name", "city", "kind", "note"]] + [
+    [f"name {i}", ["paris", "Lyon", "", "nice "][i % 4], ["a", "b", "c"][i % 3], f"Note {i % 5}"]
+    for i in range(40)
+]
+COLUMNS = TABLE[0]
+
+CASING = {"operation": "apply_letter_casing",
+          "params": {"columns": COLUMNS, "casingSelections": ["UPPERCASE", "Title Case", "None", "lowercase"]}}
+MAPPING = {"operation": "map_categorical_values",
+           "params": {"column": "kind", "unique_values": ["a", "b"], "standard_format": ["alpha", "beta"]}}
+REMOVE_BLANK_CITY = {"operation": "non_categorical_missing_values", "params": {"column": "city", "action": "Remove Rows"}}
+DEDUPE = {"operation": "dedupe", "params": {"columns": ["city", "kind"]}}
+DROP_NOTE = {"operation": "drop_columns", "params": {"columns": ["note"]}}
+
+PIPELINES = [
+    [CASING, REMOVE_BLANK_CITY],
+    [CASING, MAPPING, REMOVE_BLANK_CITY, DROP_NOTE],
+    [MAPPING, CASING, DEDUPE],
+    [CASING, DROP_NOTE, MAPPING, REMOVE_BLANK_CITY, DEDUPE],
+]
+
+
+def frame():
+    return pd.DataFrame(TABLE[1:], columns=COLUMNS)
+
+
+def lazy(steps):
+    plan = LazyPlan(COLUMNS)
+    for step in steps:
+        plan.add(step["operation"], step["params"])
+    return plan
+
+
+@pytest.mark.parametrize("steps", PIPELINES)
+def test_lazy_plan_matches_eager_pipeline(steps):
+    eager, _ = run_pipeline(frame(), steps)
+    optimized, _ = lazy(steps).execute(frame())
+    assert optimized.columns.tolist() == eager.columns.tolist()
+    assert optimized.values.tolist() == eager.values.tolist()
+
+
+def test_filters_move_ahead_of_maps_and_maps_are_fused():
+    casing = {"operation": "apply_letter_casing",
+              "params": {"columns": COLUMNS, "casingSelections": ["UPPERCASE", "None", "None", "lowercase"]}}
+    optimized = lazy([casing, MAPPING, REMOVE_BLANK_CITY]).explain()["optimized"]
+    assert optimized[0]["operation"] == "non_categorical_missing_values"
+    # Casing and category mapping run as one pass per column
+    assert len(optimized) == 2
+    assert sorted(optimized[1]["sources"]) == [0, 1]
+
+
+def test_filters_stay_behind_maps_they_depend_on():
+    optimized = lazy([CASING, REMOVE_BLANK_CITY]).explain()["optimized"]
+    assert [step["operation"] for step in optimized] == ["apply_letter_casing", "non_categorical_missing_values"]
+
+
+def test_dropped_columns_are_not_transformed():
+    optimized = lazy([CASING, DROP_NOTE]).explain()["optimized"]
+    assert all("note" not in (step["columns"] or []) for step in optimized)
+
+
+@pytest.mark.parametrize("step", [
+    {"operation": "apply_letter_casing", "params": {}},
+    {"operation": "reformat_date", "params": {}},
+    {"operation": "reformat_column", "params": {}},
+    {"operation": "map_categorical_values", "params": {}},
+])
+def test_malformed_params_name_the_step(step):
+    with pytest.raises(OperationError, match=r"Step 1 \(" + step["operation"]):
+        lazy([CASING, step])
+    with pytest.raises(OperationError, match=r"Step 1 \(" + step["operation"]):
+        run_pipeline(frame(), [CASING, step])
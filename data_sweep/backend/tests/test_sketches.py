@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import HyperLogLog, KLLSketch, Moments
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(1).lognormal(3, 1, 50_000)
+
+
+@pytest.mark.parametrize("count", [1, 2, 150, 199])
+def test_small_columns_give_exact_quantiles(count):
+    values = np.random.default_rng(count).normal(size=count)
+    sketch = KLLSketch().update(values)
+    for q in (0.25, 0.5, 0.75):
+        assert sketch.quantile(q) == pd.Series(values).quantile(q)
+
+
+def test_quantile_rank_error_stays_within_bound(values):
+    sketch = KLLSketch(seed=0)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    ordered = np.sort(values)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) <= 0.013
+
+
+def test_merged_sketches_match_one_sketch(values):
+    left, right = np.array_split(values, 2)
+    merged = KLLSketch(seed=0).update(left).merge(KLLSketch(seed=1).update(right))
+    assert merged.count == len(values)
+    ordered = np.sort(values)
+    rank = np.searchsorted(ordered, merged.quantile(0.5)) / len(values)
+    assert abs(rank - 0.5) <= 0.013
+
+
+def test_distinct_count_error_stays_within_bound():
+    values = np.arange(200_000) % 30_000
+    sketch = HyperLogLog()
+    for chunk in np.array_split(values, 5):
+        sketch.update(chunk)
+    assert abs(sketch.estimate() - 30_000) / 30_000 <= 3 * 1.04 / np.sqrt(2 ** 14)
+
+
+def test_moments_are_exact(values):
+    moments = Moments()
+    for chunk in np.array_split(np.append(values, np.nan), 9):
+        moments.update(chunk)
+    series = pd.Series(values)
+    assert moments.count == len(values)
+    assert moments.mean == pytest.approx(series.mean(), rel=1e-12)
+    assert moments.std() == pytest.approx(series.std(), rel=1e-9)
+    assert moments.skew() == pytest.approx(series.skew(), rel=1e-9)
+    assert (moments.min, moments.max) == (series.min(), series.max())
@@ -0,0 +1,94 @@
+import json
+
+import pandas as pd
+import pytest
+
+import app as app_module
+
+NUMERIC, CATEGORICAL, TEXT, DATE = [1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]
+COLUMNS = ["age", "city", "note", "joined"]
+CLASSIFICATIONS = [NUMERIC, CATEGORICAL, TEXT, DATE]
+TABLE = [
+    COLUMNS,
+    [31, "paris", "first", "2024-01-05"],
+    ["x", "lyon", "", "2024-02-30"],
+    [45, "paris", "third", "05/01/2024"],
+    [None, "nice", "fourth", "2024-03-01"],
+]
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def ndjson_records(response):
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).split("\n")
+    assert lines[-1] == ""  # every record ends with a newline
+    return [json.loads(line) for line in lines[:-1]]
+
+
+def sse_records(response):
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    messages = response.get_data(as_text=True).split("\n\n")
+    assert messages[-1] == ""
+    assert all(message.startswith("data: ") for message in messages[:-1])
+    return [json.loads(message[len("data: "):]) for message in messages[:-1]]
+
+
+def by_column(records):
+    # One record per column, in any order, then the summary record last
+    assert records[-1]["done"] is True and records[-1]["seconds"] >= 0
+    columns = {record["column"]: record for record in records[:-1]}
+    assert sorted(columns) == sorted(COLUMNS)
+    assert all(columns[name]["index"] == COLUMNS.index(name) for name in COLUMNS)
+    return columns
+
+
+def test_detect_issues_stream_matches_the_plain_response(client):
+    body = {"data": TABLE, "columns": COLUMNS, "classifications": CLASSIFICATIONS}
+    expected = client.post('/detect_issues', json=body).get_json()
+
+    records = by_column(ndjson_records(client.post('/detect_issues', json={**body, "stream": True})))
+    assert {name: record["issues"] for name, record in records.items()} == {
+        name: expected.get(name, []) for name in COLUMNS
+    }
+
+
+def test_detect_issues_stream_as_server_sent_events(client):
+    body = {"data": TABLE, "columns": COLUMNS, "classifications": CLASSIFICATIONS,
+            "stream": True, "include_profile": True}
+    response = client.post('/detect_issues', json=body, headers={"Accept": "text/event-stream"})
+    records = by_column(sse_records(response))
+    assert all("profile" in record for record in records.values())
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_statistics_stream_matches_the_plain_response(client):
+    body = {"data": TABLE, "columns": COLUMNS, "classifications": CLASSIFICATIONS, "all_columns": True}
+    expected = client.post('/calculate-statistics', json=body).get_json()["columns"]
+
+    records = by_column(ndjson_records(client.post('/calculate-statistics', json={**body, "stream": True})))
+    assert {name: {"status": record["status"], "statistics": record["statistics"]}
+            for name, record in records.items()} == expected
+
+
+def test_stored_dataset_statistics_stream(client):
+    dataset_id = app_module.dataset_store.put(pd.DataFrame(TABLE[1:], columns=COLUMNS, dtype=object))
+    body = {"dataset_id": dataset_id, "columns": COLUMNS, "classifications": CLASSIFICATIONS,
+            "all_columns": True, "stream": True}
+    inline = by_column(ndjson_records(client.post(
+        '/calculate-statistics', json={**body, "dataset_id": None, "data": TABLE})))
+    stored = by_column(ndjson_records(client.post('/calculate-statistics', json=body)))
+    assert stored == inline
+
+
+def test_failure_is_the_last_record(client):
+    # A malformed classification only fails once its column is profiled, after streaming began
+    body = {"data": TABLE, "columns": COLUMNS, "classifications": [NUMERIC, [0], TEXT, DATE], "stream": True}
+    records = ndjson_records(client.post('/detect_issues', json=body))
+    assert set(records[-1]) == {"error"}
+    assert not any(record.get("done") for record in records)
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import frame_to_table, table_to_frame
+from versions import HistoryError, VersionHistory, VersionNotFound
+
+TABLE = [["id", "name", "city"]] + [[i, f"name{i}", f"city{i % 3}"] for i in range(8)]
+
+
+def route_round_trip(history):
+    # What a route does with a stored dataset: table out, DataFrame rebuilt from the lists
+    table = frame_to_table(history.frame())
+    return pd.DataFrame(table[1:], columns=table[0])
+
+
+def stored_blocks(history):
+    return {id(block.base if block.base is not None else block)
+            for version in history.versions.values() for block in version.blocks}
+
+
+def test_commit_shares_unchanged_columns():
+    history = VersionHistory(table_to_frame(TABLE))
+    df = route_round_trip(history)
+    df['name'] = df['name'].str.upper()
+    history.commit(df, 'casing')
+
+    parent, current = history.versions.values()
+    assert current.blocks[0] is parent.blocks[0]
+    assert current.blocks[2] is parent.blocks[2]
+    assert current.blocks[1] is not parent.blocks[1]
+    assert len(stored_blocks(history)) == 4
+
+
+def test_sharing_survives_filter_then_edit_through_routes():
+    history = VersionHistory(table_to_frame(TABLE))
+    df = route_round_trip(history)
+    history.commit(df[df['id'] != 1], 'filter')
+    after_filter = history.nbytes
+
+    df = route_round_trip(history)
+    assert df.index.equals(pd.RangeIndex(7))
+    df['city'] = df['city'].str.upper()
+    history.commit(df, 'casing')
+
+    current = history.versions[history.current]
+    filtered = history.versions[current.parent_id]
+    assert current.blocks[0] is filtered.blocks[0]
+    assert current.blocks[1] is filtered.blocks[1]
+    # Only the changed column costs anything
+    assert history.nbytes - after_filter < after_filter / 2
+    assert frame_to_table(history.frame())[2] == [2, "name2", "CITY2"]
+
+
+def test_filter_shares_columns_as_row_selections():
+    history = VersionHistory(table_to_frame(TABLE))
+    df = route_round_trip(history)
+    history.commit(df[df['id'] % 2 == 0], 'filter')
+
+    current = history.versions[history.current]
+    assert all(block.base is not None for block in current.blocks)
+    assert current.positions.tolist() == [0, 2, 4, 6]
+    assert frame_to_table(history.frame()) == [TABLE[0]] + TABLE[1::2]
+
+
+def test_frame_rebuilt_from_a_plain_table_is_stored_correctly():
+    # Labels that do not match the parent rows must never share the wrong values
+    history = VersionHistory(table_to_frame(TABLE))
+    table = [TABLE[0]] + TABLE[3:]
+    history.commit(table_to_frame(table), 'filter')
+    assert frame_to_table(history.frame()) == table
+
+
+def test_undo_redo_checkout():
+    history = VersionHistory(table_to_frame(TABLE))
+    root = history.current
+    df = route_round_trip(history)
+    df['name'] = df['name'].str.upper()
+    edited = history.commit(df, 'casing')
+
+    history.undo()
+    assert history.current == root
+    assert frame_to_table(history.frame()) == TABLE
+    with pytest.raises(HistoryError):
+        history.undo()
+
+    history.redo()
+    assert history.current == edited
+    assert frame_to_table(history.frame())[1][1] == "NAME0"
+    with pytest.raises(HistoryError):
+        history.redo()
+
+    history.checkout(root)
+    assert frame_to_table(history.frame()) == TABLE
+    with pytest.raises(VersionNotFound):
+        history.checkout('missing')
+
+
+def test_history_is_not_rewritten_by_in_place_edits():
+    frame = table_to_frame(TABLE)
+    history = VersionHistory(frame)
+    frame.iloc[0, 1] = "changed"
+    history.frame().iloc[1, 1] = "changed too"
+
+    df = route_round_trip(history)
+    df['city'] = 'x'
+    history.commit(df, 'edit')
+    df.iloc[2, 2] = 'edited after commit'
+    history.undo()
+
+    assert frame_to_table(history.frame()) == TABLE
+
+
+def test_changed_types_are_changes():
+    table = [["value"], [1], [None], [3]]
+    history = VersionHistory(table_to_frame(table))
+    root_block = history.versions[history.current].blocks[0]
+    history.commit(table_to_frame([["value"], [1.0], [np.nan], [3]]), 'retype')
+    assert history.versions[history.current].blocks[0] is not root_block
+
+
+def apply_delta(base_table, delta):
+    # What a client holding `base_table` does with a delta response
+    header, rows = base_table[0], base_table[1:]
+    removed = set(delta["removed_rows"])
+    kept = [row for i, row in enumerate(rows) if i not in removed]
+    columns = {name: [row[header.index(name)] for row in kept] for name in header}
+    columns.update(delta["changed"])
+    return [delta["columns"]] + [list(values) for values in zip(*(columns[name] for name in delta["columns"]))]
+
+
+def test_delta_after_filter_then_column_edit():
+    history = VersionHistory(table_to_frame(TABLE))
+    base = history.current
+    df = route_round_trip(history)
+    history.commit(df[df['id'] != 1], 'filter')
+    df = route_round_trip(history)
+    df['city'] = df['city'].str.upper()
+    history.commit(df, 'casing')
+
+    delta = history.delta(base)
+    assert delta is not None
+    assert delta["removed_rows"] == [1]
+    assert set(delta["changed"]) == {"city"}
+    assert apply_delta(TABLE, delta) == frame_to_table(history.frame())
+
+
+def test_delta_from_a_descendant_falls_back_to_the_full_table():
+    history = VersionHistory(table_to_frame(TABLE))
+    df = route_round_trip(history)
+    child = history.commit(df[df['id'] > 2], 'filter')
+    history.undo()
+    assert history.delta(child) is None
+
+
+def test_delta_without_changes():
+    history = VersionHistory(table_to_frame(TABLE))
+    delta = history.delta(history.current)
+    assert delta["removed_rows"] == [] and delta["changed"] == {}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from date_engine import parse_dates
+
+# Typed views of a column (numbers, parsed dates, dictionary codes), computed once
+# and memoized in a per-column cache dict. Stored datasets hand out the cache of
+# the column's version block (DatasetStore.column_caches), so every route shares
+# the same conversion until an operation changes the column. Without a cache the
+# conversion is simply computed.
+
+
+def _cached(cache, key, compute):
+    if cache is None:
+        return compute()
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache[key] = result
+    return result
+
+
+def numeric_values(values):
+    """float() of every value, vectorized over the unique values: returns the
+    numbers (NaN where conversion fails) and a mask of where float() succeeds."""
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    numbers = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy().astype(float)
+    valid = ~np.isnan(numbers)
+
+    # Anything pandas rejected (or read as NaN) gets the exact float() check
+    for index in np.flatnonzero(~valid):
+        try:
+            numbers[index] = float(uniques[index])
+            valid[index] = True
+        except (ValueError, TypeError):
+            pass
+
+    present = codes >= 0
+    result = np.full(len(values), np.nan)
+    result[present] = numbers[codes[present]]
+    mask = np.zeros(len(values), dtype=bool)
+    mask[present] = valid[codes[present]]
+    # factorize treats None and NaN as missing; float() accepts NaN but not None
+    for index in np.flatnonzero(~present):
+        try:
+            result[index] = float(values[index])
+            mask[index] = True
+        except (ValueError, TypeError):
+            pass
+    return result, mask
+
+
+def numeric_column(values, cache=None):
+    """(numbers, valid) for a column, with float() semantics; see numeric_values."""
+    return _cached(cache, ('numeric',), lambda: numeric_values(values))
+
+
+def coerced_numeric_column(series, cache=None):
+    """pd.to_numeric(series, errors='coerce') as an array: the conversion the numeric
+    cleaning operations apply (integers stay integers, anything else unparsable is NaN)."""
+    return _cached(cache, ('to_numeric',), lambda: pd.to_numeric(series, errors='coerce').to_numpy())
+
+
+def date_column(values, formats, cache=None):
+    """ParsedDates of a column for the given formats."""
+    formats = tuple(formats)
+    return _cached(cache, ('dates', formats), lambda: parse_dates(values, formats))
+
+
+def encoded_column(values, cache=None):
+    """(codes, uniques) dictionary encoding of a column; missing values get their own code."""
+    return _cached(cache, ('dictionary',), lambda: pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False))
@@ -0,0 +1,371 @@
+import os
+import pickle
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+class VersionNotFound(KeyError):
+    def __init__(self, version_id):
+        super().__init__(version_id)
+        self.version_id = version_id
+
+    def __str__(self):
+        return f"Version '{self.version_id}' not found"
+
+
+class HistoryError(ValueError):
+    pass
+
+
+def values_nbytes(values):
+    return int(pd.Series(values, copy=False).memory_usage(deep=True, index=False))
+
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+def column_values(frame, position):
+    # Categorical columns keep their compact Categorical; everything else is a numpy array
+    series = frame.iloc[:, position]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    return series.to_numpy()
+
+
+def _as_objects(values):
+    return np.asarray(values, dtype=object)
+
+
+def _same_values(a, b):
+    if a is b:
+        return True
+    if a.shape != b.shape:
+        return False
+    if a.dtype == b.dtype and (not isinstance(a, np.ndarray) or a.dtype != object):
+        return pd.Series(a, copy=False).equals(pd.Series(b, copy=False))
+    # Object columns, or the same column in different dtypes (e.g. a compact int8 or
+    # categorical block against the object column a route rebuilt from a table), are
+    # compared as the Python values they give back. Value and type must match, so
+    # 1 vs 1.0 or None vs NaN count as changes.
+    a, b = _as_objects(a), _as_objects(b)
+    equal = (a == b) | (pd.isna(a) & pd.isna(b))
+    return bool((equal & (_type_of(a) == _type_of(b))).all())
+
+
+def _stored_values(values):
+    # Blocks own a copy of their values, so editing the committed frame in place
+    # afterwards cannot rewrite history
+    return values.copy()
+
+
+def _parent_positions(index, parent_rows):
+    """Parent row positions of a committed frame's rows. Stored versions are indexed
+    0..n-1, so a frame derived from one by filtering or reordering carries its parent
+    positions as index labels. None when the labels cannot be positions."""
+    if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1 and len(index) <= parent_rows:
+        return np.arange(len(index))
+    if not pd.api.types.is_integer_dtype(index.dtype) or not index.is_unique:
+        return None
+    positions = index.to_numpy(dtype=np.intp)
+    if len(positions) and (positions.min() < 0 or positions.max() >= parent_rows):
+        return None
+    return positions
+
+
+class _Block:
+    """One column's values. A block is either held in memory, spilled to disk, or a
+    row selection (`positions`) of another block, so filtering rows does not copy
+    the columns it leaves unchanged."""
+
+    __slots__ = ('values', 'base', 'positions', 'path', 'nbytes', 'cache')
+
+    def __init__(self, values=None, base=None, positions=None):
+        self.values = values
+        self.base = base
+        self.positions = positions
+        self.path = None
+        # Selections only cost their positions array, which the version already counts
+        self.nbytes = values_nbytes(values) if values is not None else 0
+        # Results derived from these exact values (e.g. column statistics); a changed
+        # column gets a new block, so this is invalidated only for the columns touched
+        self.cache = {}
+
+    def materialize(self):
+        # In-memory blocks return their own array; see Version.frame for handing it out
+        if self.base is not None:
+            return self.base.materialize()[self.positions]
+        if self.values is None:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        return self.values
+
+    def take(self, positions):
+        # Selections always point at a stored block, never at another selection
+        if self.base is not None:
+            return _Block(base=self.base, positions=self.positions[positions])
+        return _Block(base=self, positions=positions)
+
+    def spill(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.values, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+        self.values = None
+
+
+class Version:
+    """One committed table. Rows are always indexed 0..n-1; `positions` maps them to
+    the parent's rows (None when they are the parent's rows unchanged), and
+    `rows_matched` is False when the rows could not be traced to the parent at all."""
+
+    __slots__ = ('version_id', 'parent_id', 'operation', 'created', 'columns', 'index', 'blocks', 'positions',
+                 'rows_matched', 'cache')
+
+    def __init__(self, parent_id, operation, columns, rows, blocks, positions=None, rows_matched=True):
+        self.version_id = uuid.uuid4().hex[:12]
+        self.parent_id = parent_id
+        self.operation = operation
+        self.created = time.time()
+        self.columns = columns
+        self.index = pd.RangeIndex(rows)
+        self.blocks = blocks
+        self.positions = positions
+        self.rows_matched = rows_matched
+        self.cache = {}  # results over several columns of this version (e.g. duplicate row indexes)
+
+    def frame(self):
+        columns = {}
+        for i, block in enumerate(self.blocks):
+            values = block.materialize()
+            # Selections and spilled blocks are fresh arrays already; stored ones are copied
+            # so that editing the frame in place cannot rewrite history
+            columns[i] = values.copy() if values is block.values else values
+        frame = pd.DataFrame(columns, index=self.index, copy=False)
+        frame.columns = self.columns
+        return frame
+
+
+class VersionHistory:
+    """Versions of one dataset, copy-on-write at column granularity.
+
+    Every commit is a new version whose unchanged columns share storage with its
+    parent, so history costs roughly the size of what each operation changed. When
+    the in-memory blocks exceed `max_bytes`, the oldest versions are spilled to
+    `spill_dir` if one is configured, otherwise dropped (the current version never is).
+    """
+
+    def __init__(self, frame, max_bytes=256 * 1024 ** 2, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.versions = {}  # version_id -> Version, oldest first
+        self.current = None
+        self._redo = []
+        self._frame = None  # materialized frame of the current version
+        self.nbytes = 0
+        root = Version(None, 'upload', frame.columns.tolist(), len(frame),
+                       [_Block(_stored_values(column_values(frame, i))) for i in range(frame.shape[1])])
+        self._add(root)
+
+    def frame(self):
+        if self._frame is None:
+            self._frame = self.versions[self.current].frame()
+        return self._frame
+
+    def commit(self, frame, operation=None, base_version=None):
+        """Commit `frame` as a new version. Its index labels are read as positions in
+        the current version's rows (what filtering or reordering a stored frame leaves);
+        columns are shared only where their values are equal under that mapping, so a
+        frame rebuilt from a plain table is still stored correctly.
+
+        `base_version` is the version the frame was computed from. When it is given and
+        no longer current (another commit, undo or checkout got in first), HistoryError
+        is raised: committing would lose that change and misread the frame's labels."""
+        if base_version is not None and base_version != self.current:
+            raise HistoryError(f"Dataset changed since version '{base_version}' was read "
+                               f"(now at '{self.current}'); reload it and try again")
+        parent = self.versions[self.current]
+        parent_blocks = {}
+        for name, block in zip(parent.columns, parent.blocks):
+            parent_blocks.setdefault(name, block)
+
+        positions = _parent_positions(frame.index, len(parent.index))
+        same_rows = positions is not None and len(positions) == len(parent.index) and (
+            positions == np.arange(len(positions))).all()
+
+        blocks = []
+        for i, name in enumerate(frame.columns):
+            values = column_values(frame, i)
+            old = parent_blocks.get(name)
+            block = None
+            if old is not None and same_rows and _same_values(old.materialize(), values):
+                block = old
+            elif old is not None and positions is not None and not same_rows and _same_values(
+                    old.materialize()[positions], values):
+                block = old.take(positions)
+            blocks.append(block if block is not None else _Block(_stored_values(values)))
+
+        version = Version(parent.version_id, operation, frame.columns.tolist(), len(frame), blocks,
+                          None if same_rows else positions, rows_matched=positions is not None)
+        self._redo = []
+        self._add(version)
+        return version.version_id
+
+    def undo(self):
+        parent_id = self.versions[self.current].parent_id
+        if parent_id is None or parent_id not in self.versions:
+            raise HistoryError("Nothing to undo")
+        self._redo.append(self.current)
+        self._move_to(parent_id)
+
+    def redo(self):
+        while self._redo:
+            version_id = self._redo.pop()
+            if version_id in self.versions:
+                self._move_to(version_id)
+                return
+        raise HistoryError("Nothing to redo")
+
+    def checkout(self, version_id):
+        if version_id not in self.versions:
+            raise VersionNotFound(version_id)
+        self._redo = []
+        self._move_to(version_id)
+
+    def describe(self):
+        return {
+            "current": self.current,
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "can_undo": self.versions[self.current].parent_id in self.versions,
+            "can_redo": any(version_id in self.versions for version_id in self._redo),
+            "versions": [
+                {
+                    "version_id": version.version_id,
+                    "parent_id": version.parent_id,
+                    "operation": version.operation,
+                    "created": version.created,
+                    "rows": len(version.index),
+                    "columns": version.columns,
+                    "spilled": any(block.path is not None and block.base is None for block in version.blocks),
+                }
+                for version in self.versions.values()
+            ],
+        }
+
+    def delta(self, base_version_id):
+        """Patch that turns version `base_version_id` into the current version:
+        removed row positions (in the base), the new column order, and the full
+        values of every column that is new or changed. None when the current rows
+        are not a same-order subset of the base rows, or the base is not an ancestor."""
+        if base_version_id not in self.versions:
+            raise VersionNotFound(base_version_id)
+        base = self.versions[base_version_id]
+        current = self.versions[self.current]
+
+        positions = self._base_positions(base_version_id)
+        if positions is None or (np.diff(positions) <= 0).any():
+            return None
+        if len(positions) == len(base.index):
+            positions = None  # same rows
+            removed = []
+        else:
+            keep = np.zeros(len(base.index), dtype=bool)
+            keep[positions] = True
+            removed = np.flatnonzero(~keep).tolist()
+
+        base_blocks = {}
+        for name, block in zip(base.columns, base.blocks):
+            base_blocks.setdefault(name, block)
+        changed = {}
+        for name, block in zip(current.columns, current.blocks):
+            old = base_blocks.get(name)
+            if old is block:
+                continue
+            values = block.materialize()
+            if old is not None:
+                old_values = old.materialize()
+                if _same_values(old_values if positions is None else old_values[positions], values):
+                    continue
+            changed[name] = values.tolist()
+
+        return {
+            "base_version": base_version_id,
+            "version": self.current,
+            "columns": current.columns,
+            "removed_rows": removed,
+            "changed": changed,
+        }
+
+    def _base_positions(self, base_version_id):
+        # Positions in the base version's rows of the current rows, composed along
+        # the parent links; None when the base is not an ancestor or a link is unknown
+        version = self.versions[self.current]
+        positions = np.arange(len(version.index))
+        while version.version_id != base_version_id:
+            if not version.rows_matched or version.parent_id not in self.versions:
+                return None
+            if version.positions is not None:
+                positions = version.positions[positions]
+            version = self.versions[version.parent_id]
+        return positions
+
+    def version_cache(self):
+        return self.versions[self.current].cache
+
+    def column_cache(self, position):
+        return self.versions[self.current].blocks[position].cache
+
+    def close(self):
+        # Remove this history's spill files
+        for block in self._stored_blocks():
+            if block.path is not None:
+                try:
+                    os.remove(block.path)
+                except OSError:
+                    pass
+
+    def _add(self, version):
+        self.versions[version.version_id] = version
+        self.current = version.version_id
+        # Rebuilt from the blocks on the next read, never the caller's frame, so the
+        # frame handed out always matches the stored version
+        self._frame = None
+        self._enforce_budget()
+
+    def _move_to(self, version_id):
+        self.current = version_id
+        self._frame = None
+
+    def _stored_blocks(self):
+        # Every distinct stored block reachable from a kept version
+        seen = {}
+        for version in self.versions.values():
+            for block in version.blocks:
+                stored = block.base if block.base is not None else block
+                seen[id(stored)] = stored
+        return seen.values()
+
+    def _memory_bytes(self):
+        blocks = sum(block.nbytes for block in self._stored_blocks() if block.values is not None)
+        positions = sum(version.positions.nbytes for version in self.versions.values() if version.positions is not None)
+        return blocks + positions
+
+    def _enforce_budget(self):
+        self.nbytes = self._memory_bytes()
+        if self.max_bytes is None:
+            return
+        current_blocks = {id(block.base if block.base is not None else block) for block in self.versions[self.current].blocks}
+        for version in list(self.versions.values()):
+            if self.nbytes <= self.max_bytes:
+                break
+            if version.version_id == self.current:
+                continue
+            if self.spill_dir:
+                for block in version.blocks:
+                    stored = block.base if block.base is not None else block
+                    if stored.values is not None and id(stored) not in current_blocks:
+                        stored.spill(os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.pkl"))
+            else:
+                del self.versions[version.version_id]
+            self.nbytes = self._memory_bytes()